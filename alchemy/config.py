@@ -1,17 +1,45 @@
 """
 Centralised configuration via pydantic-settings.
-All values can be overridden with environment variables.
+All values can be overridden with environment variables or constructor
+arguments (server.py passes its CLI flags this way).
 """
 
+import os
+
 from pydantic_settings import BaseSettings
 from typing import Optional
 
+# CUDA runtime tuning — must be set before torch initialises CUDA.
+# Lazy module loading pages kernels in on first use; expandable segments
+# curb fragmentation from repeated model load/unload cycles.
+os.environ.setdefault("CUDA_MODULE_LOADING", "LAZY")
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
+
+# Crawl4AI browser retirement — recycle Chromium after N pages or once host
+# memory passes the threshold, so long-running servers don't accumulate
+# renderer memory. Costs one browser relaunch per retirement.
+os.environ.setdefault("CRAWL4AI_BROWSER_RETIREMENT_ENABLED", "true")
+os.environ.setdefault("CRAWL4AI_BROWSER_MAX_USAGE", "100")
+os.environ.setdefault("CRAWL4AI_MEMORY_RETIRE_THRESHOLD", "75")
+os.environ.setdefault("CRAWL4AI_POOL_AUDIT_ENABLED", "true")
+
 
 class Settings(BaseSettings):
     # ── Server ────────────────────────────────────────────────────────────────
     host: str = "0.0.0.0"
     port: int = 8000
-    max_workers: int = 2          # async job-queue concurrency
+    max_workers: int = 2          # document/image job-queue concurrency
+    media_workers: int = 1        # audio/video job-queue concurrency
+    web_workers: int = 2          # web crawl job-queue concurrency
+    max_queue_size: int = 32      # jobs waiting for a worker (min 2×max_workers)
+    max_batch_backlog: int = 1024 # batch jobs held past max_queue_size; fed in as workers free up
+    job_store_size: int = 10_000  # jobs kept for status lookups (oldest evicted first)
+    job_ttl_s: int = 3600         # seconds a job stays queryable after it finishes
+    batch_dir: Optional[str] = None   # root for /v1/batches files (None = batches disabled)
+
+    # ── GPU Memory ────────────────────────────────────────────────────────────
+    lazy_unload: bool = True      # keep parsers resident until VRAM is needed
+    vram_budget_gb: Optional[float] = None   # cap for resident parsers (None = device free memory)
 
     # ── Feature Flags ─────────────────────────────────────────────────────────
     load_documents: bool = True
@@ -22,17 +50,24 @@ class Settings(BaseSettings):
     docling_device: str = "auto"  # auto | cpu | cuda | mps
     docling_ocr_enabled: bool = True
     docling_table_mode: str = "accurate"  # fast | accurate
+    docling_workers: int = 2              # parsing processes (0 = in-process thread)
+    docling_pin_cores: bool = False       # give each Docling process its own slice of CPUs (Linux)
 
     # ── Image Parser (Qwen2-VL) ───────────────────────────────────────────────
     vision_model: str = "Qwen/Qwen2-VL-7B-Instruct-AWQ"   # AWQ-quantised, ~6 GB VRAM
     vision_device: str = "auto"
     vision_max_new_tokens: int = 1024
+    vision_max_batch: int = 4               # requests coalesced into one generate call
+    vision_batch_wait_ms: int = 20          # how long to wait for a batch to fill
+    vision_compile: bool = True             # torch.compile the vision tower (CUDA only)
 
     # ── Audio/Video (Distil-Whisper) ──────────────────────────────────────────
     whisper_model: str = "distil-whisper/distil-large-v3"
     whisper_device: str = "auto"
-    whisper_compute_type: str = "float16"   # float16 | int8
+    whisper_compute_type: str = "int8_float16"   # int8_float16 | float16 | int8
     whisper_batch_size: int = 16
+    whisper_beam_size: int = 1              # greedy; distil-whisper gains little from beams
+    whisper_condition_on_previous: bool = False
 
     # ── Diarization (pyannote) ────────────────────────────────────────────────
     diarization_enabled: bool = False       # requires HuggingFace token
@@ -44,12 +79,19 @@ class Settings(BaseSettings):
     crawler_user_agent: str = (
         "Mozilla/5.0 (compatible; AlchemyBot/2.0; +https://github.com/your-username/alchemy)"
     )
+    crawler_block_ads: bool = True          # drop ad/tracker requests (markdown-only crawls)
+    crawler_block_css: bool = True          # drop stylesheets; disable for screenshots
+    crawler_data_dir: Optional[str] = None  # persistent browser profile (shared cookies!)
+    web_cache_ttl: int = 300                # seconds to reuse a crawl result (0 = off)
+    web_cache_size: int = 1024
 
     # ── Output / Chunking ─────────────────────────────────────────────────────
     default_output_format: str = "markdown"    # markdown | json | chunks
     chunk_size: int = 512
     chunk_overlap: int = 64
     semantic_chunking: bool = True
+    chunk_prepend_title: bool = True      # prefix chunk text with its section heading
+    chunk_prepend_source: bool = True     # ...and with the filename / URL
 
     # ── Logging ───────────────────────────────────────────────────────────────
     log_level: str = "INFO"
@@ -58,3 +100,4 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         extra = "ignore"
+        frozen = True             # read-only after startup; pass overrides to the constructor
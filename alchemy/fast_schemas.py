@@ -0,0 +1,45 @@
+"""
+msgspec response types for hot endpoints
+----------------------------------------
+/job/{id} is polled continuously by async clients. Its response is built
+as a msgspec Struct and encoded in C, skipping Pydantic model construction
+and FastAPI's response_model validation. The wire format matches
+schemas.JobStatusResponse.
+"""
+
+from __future__ import annotations
+from typing import Any, Optional
+
+import msgspec
+from fastapi import Response
+from pydantic import BaseModel
+
+from alchemy.schemas import JobStatus
+
+
+class JobStatusStruct(msgspec.Struct):
+    job_id: str
+    status: JobStatus
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+def _enc_hook(obj: Any) -> Any:
+    # Parser results are Pydantic models (ParseResponse)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
+def encode(obj: Any) -> bytes:
+    return _encoder.encode(obj)
+
+
+class MsgspecJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _encoder.encode(content)
@@ -1,12 +1,17 @@
 """
 ModelManager — singleton that owns all model instances.
-Models are loaded once at startup and kept warm in memory.
-Supports lazy loading per modality.
+Models are loaded lazily on first use per modality and kept warm in memory.
+Callers hold a parser through a lease (`async with manager.use_document_parser()`)
+so it can't be evicted mid-parse.
 """
 
 from __future__ import annotations
+import asyncio
 import logging
-from typing import Optional, TYPE_CHECKING
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, TYPE_CHECKING
 
 from alchemy.config import Settings
 
@@ -20,85 +25,180 @@ logger = logging.getLogger(__name__)
 
 
 class ModelManager:
+    # Approximate resident VRAM (GB) of each GPU-backed parser, used to decide
+    # how many least-recently-used parsers to evict before loading another.
+    VRAM_ESTIMATES_GB = {"doc": 2.0, "img": 6.0, "media": 2.0}
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self._document_parser: Optional["DocumentParser"] = None
         self._image_parser: Optional["ImageParser"] = None
         self._media_parser: Optional["MediaParser"] = None
         self._web_parser: Optional["WebParser"] = None
-        self._loaded: set[str] = set()
+        # Immutable snapshot, replaced on load/evict — /health reads it as-is
+        self._loaded: tuple[str, ...] = ()
+        self._enabled: set[str] = set()
+        self._locks = {k: asyncio.Lock() for k in ("doc", "img", "media", "web")}
+        self._gpu_lock = asyncio.Lock()   # serialises evict + load of GPU parsers
+        self._usage_order: OrderedDict[str, float] = OrderedDict()
+        # Active leases per parser; busy parsers are never evicted
+        self._in_use: dict[str, int] = dict.fromkeys(self._locks, 0)
+        self._released = asyncio.Condition()
+        # key → (attribute, loaded-name, loader, error hint)
+        self._registry = {
+            "doc": ("_document_parser", "docling", self._load_document_parser,
+                    "Document parser not enabled. Start server with --documents flag."),
+            "img": ("_image_parser", "qwen2-vl", self._load_image_parser,
+                    "Image parser not enabled. Start server with --documents flag."),
+            "media": ("_media_parser", "distil-whisper", self._load_media_parser,
+                      "Media parser not enabled. Start server with --media flag."),
+            "web": ("_web_parser", "crawl4ai", self._load_web_parser,
+                    "Web parser not enabled. Start server with --web flag."),
+        }
 
     async def initialize(self):
-        """Load models according to feature flags."""
+        """Record which modalities are enabled. Models load on first access."""
         if self.settings.load_documents:
-            await self._load_document_parser()
+            # Image parser is bundled with the document feature flag
+            self._enabled.update(("doc", "img"))
         if self.settings.load_media:
-            await self._load_media_parser()
-        # Image parser shares the VLM loaded by document parser
-        if self.settings.load_documents:
-            await self._load_image_parser()
+            self._enabled.add("media")
         if self.settings.load_web:
-            await self._load_web_parser()
+            self._enabled.add("web")
 
     # ── Lazy accessors ────────────────────────────────────────────────────────
-    @property
-    def document_parser(self) -> "DocumentParser":
-        if not self._document_parser:
-            raise RuntimeError("Document parser not loaded. Start server with --documents flag.")
-        return self._document_parser
-
-    @property
-    def image_parser(self) -> "ImageParser":
-        if not self._image_parser:
-            raise RuntimeError("Image parser not loaded.")
-        return self._image_parser
-
-    @property
-    def media_parser(self) -> "MediaParser":
-        if not self._media_parser:
-            raise RuntimeError("Media parser not loaded. Start server with --media flag.")
-        return self._media_parser
-
-    @property
-    def web_parser(self) -> "WebParser":
-        if not self._web_parser:
-            raise RuntimeError("Web parser not loaded. Start server with --web flag.")
-        return self._web_parser
-
-    def loaded_models(self) -> list[str]:
-        return list(self._loaded)
+    def use_document_parser(self) -> AsyncIterator["DocumentParser"]:
+        return self._lease("doc")
+
+    def use_image_parser(self) -> AsyncIterator["ImageParser"]:
+        return self._lease("img")
+
+    def use_media_parser(self) -> AsyncIterator["MediaParser"]:
+        return self._lease("media")
+
+    def use_web_parser(self) -> AsyncIterator["WebParser"]:
+        return self._lease("web")
+
+    @asynccontextmanager
+    async def _lease(self, key: str):
+        """Load (if needed) and hold a parser; it stays resident until released."""
+        parser = await self._acquire(key)
+        # No await between _acquire returning and this increment, so an
+        # eviction can't slip in and unload the parser we were handed
+        self._in_use[key] += 1
+        try:
+            yield parser
+        finally:
+            self._in_use[key] -= 1
+            async with self._released:
+                self._released.notify_all()
+
+    async def _acquire(self, key: str):
+        attr, _, loader, hint = self._registry[key]
+        if key not in self._enabled:
+            raise RuntimeError(hint)
+        async with self._locks[key]:
+            if getattr(self, attr) is None:
+                if key in self.VRAM_ESTIMATES_GB:
+                    async with self._gpu_lock:
+                        await self._make_room(key)
+                        await loader()
+                else:
+                    await loader()
+        if key in self.VRAM_ESTIMATES_GB:
+            self._usage_order[key] = time.monotonic()
+            self._usage_order.move_to_end(key)
+        return getattr(self, attr)
+
+    # ── LRU eviction ──────────────────────────────────────────────────────────
+    async def _make_room(self, key: str):
+        """
+        Unload least-recently-used idle GPU parsers until `key` fits in VRAM.
+        If every resident parser is busy, wait for one to be released.
+        """
+        required = self.VRAM_ESTIMATES_GB[key]
+        while self._usage_order:
+            if self.settings.lazy_unload and not self._over_budget(required):
+                break
+            victim = next((k for k in self._usage_order if not self._in_use[k]), None)
+            if victim is not None:
+                await self._evict(victim)
+                continue
+            logger.info(f"⏳ All resident parsers are busy; waiting to load {key}...")
+            async with self._released:
+                await self._released.wait_for(
+                    lambda: any(not self._in_use[k] for k in self._usage_order)
+                )
+
+    def _over_budget(self, required: float) -> bool:
+        budget = self.settings.vram_budget_gb
+        if budget is not None:
+            resident = sum(self.VRAM_ESTIMATES_GB[k] for k in self._usage_order)
+            if resident + required > budget:
+                return True
+        free = self._free_vram_gb()
+        return free is not None and free < required
+
+    @staticmethod
+    def _free_vram_gb() -> Optional[float]:
+        try:
+            import torch
+        except ImportError:
+            return None
+        if not torch.cuda.is_available():
+            return None
+        free, _ = torch.cuda.mem_get_info()
+        return free / (1 << 30)
+
+    async def _evict(self, key: str):
+        attr, name, _, _ = self._registry[key]
+        parser = getattr(self, attr)
+        self._usage_order.pop(key, None)
+        if parser is None:
+            return
+        logger.info(f"♻️  Evicting {name} to free VRAM...")
+        setattr(self, attr, None)
+        self._loaded = tuple(n for n in self._loaded if n != name)
+        await parser.cleanup()
+
+    def loaded_models(self) -> tuple[str, ...]:
+        return self._loaded
 
     # ── Loaders ───────────────────────────────────────────────────────────────
     async def _load_document_parser(self):
         logger.info("📄 Loading document parser (Docling)...")
         from alchemy.parsers.document import DocumentParser
-        self._document_parser = DocumentParser(self.settings)
-        await self._document_parser.initialize()
-        self._loaded.add("docling")
+        parser = DocumentParser(self.settings)
+        await parser.initialize()
+        self._document_parser = parser
+        self._loaded += ("docling",)
         logger.info("✅ Document parser ready.")
 
     async def _load_image_parser(self):
         logger.info("🖼️  Loading image parser (Qwen2-VL)...")
         from alchemy.parsers.image import ImageParser
-        self._image_parser = ImageParser(self.settings)
-        await self._image_parser.initialize()
-        self._loaded.add("qwen2-vl")
+        parser = ImageParser(self.settings)
+        await parser.initialize()
+        self._image_parser = parser
+        self._loaded += ("qwen2-vl",)
         logger.info("✅ Image parser ready.")
 
     async def _load_media_parser(self):
         logger.info("🎙️  Loading media parser (Distil-Whisper)...")
         from alchemy.parsers.media import MediaParser
-        self._media_parser = MediaParser(self.settings)
-        await self._media_parser.initialize()
-        self._loaded.add("distil-whisper")
+        parser = MediaParser(self.settings)
+        await parser.initialize()
+        self._media_parser = parser
+        self._loaded += ("distil-whisper",)
         logger.info("✅ Media parser ready.")
 
     async def _load_web_parser(self):
         logger.info("🌐 Loading web parser (Crawl4AI)...")
         from alchemy.parsers.web import WebParser
-        self._web_parser = WebParser(self.settings)
-        await self._web_parser.initialize()
-        self._loaded.add("crawl4ai")
+        parser = WebParser(self.settings)
+        await parser.initialize()
+        self._web_parser = parser
+        self._loaded += ("crawl4ai",)
         logger.info("✅ Web parser ready.")
 
     async def cleanup(self):
@@ -20,16 +20,44 @@ import asyncio
 import io
 import json
 import logging
-import tempfile
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, AsyncIterator, Optional
 
 from alchemy.config import Settings
 from alchemy.schemas import ParseResponse, TableData, DocumentChunk
+from alchemy.utils.affinity import pin_to_slice
 from alchemy.utils.chunker import SemanticChunker
+from alchemy.utils.gpu import flush_gpu_cache
 
 logger = logging.getLogger(__name__)
 
+# Per-process parser used by the Docling process pool (see DocumentParser.initialize)
+_worker_parser: Optional["DocumentParser"] = None
+
+
+def _init_worker(settings: Settings, next_slot=None):
+    """Process-pool initializer: load one Docling converter per worker process."""
+    global _worker_parser
+    if next_slot is not None:
+        # Round-robin slice allocation shared by all pool processes
+        with next_slot.get_lock():
+            slot = next_slot.value
+            next_slot.value += 1
+        cores = pin_to_slice(slot, settings.docling_workers)
+        if cores is not None:
+            # Size torch/OpenMP thread pools to the slice (set before docling imports torch)
+            os.environ["OMP_NUM_THREADS"] = str(len(cores))
+            logger.info(f"Docling worker {os.getpid()} pinned to CPUs {cores}.")
+    _worker_parser = DocumentParser(settings)
+    _worker_parser._load_models()
+
+
+def _parse_in_worker(source: bytes | str, *args) -> ParseResponse:
+    return _worker_parser._parse_sync(source, *args)
+
 
 class DocumentParser:
     SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc", ".pptx", ".ppt", ".html", ".htm", ".xlsx"}
@@ -38,10 +66,26 @@ class DocumentParser:
         self.settings = settings
         self._converter = None
         self._chunker: Optional[SemanticChunker] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
 
     async def initialize(self):
-        """Load Docling converter in a thread to avoid blocking the event loop."""
-        await asyncio.get_event_loop().run_in_executor(None, self._load_models)
+        """
+        Start the Docling process pool, or load the converter in a thread when
+        docling_workers=0. Docling's layout/OCR models hold the GIL for much of
+        their runtime, so separate processes are what let N PDFs parse in parallel.
+        """
+        if self.settings.docling_workers > 0:
+            ctx = multiprocessing.get_context("spawn")   # fork is unsafe with CUDA
+            next_slot = ctx.Value("i", 0) if self.settings.docling_pin_cores else None
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.settings.docling_workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self.settings, next_slot),
+            )
+            logger.info(f"Docling process pool started ({self.settings.docling_workers} workers).")
+        else:
+            await asyncio.get_event_loop().run_in_executor(None, self._load_models)
 
     def _load_models(self):
         from docling.document_converter import DocumentConverter, PdfFormatOption
@@ -67,111 +111,125 @@ class DocumentParser:
             self._chunker = SemanticChunker(
                 chunk_size=self.settings.chunk_size,
                 chunk_overlap=self.settings.chunk_overlap,
+                prepend_title=self.settings.chunk_prepend_title,
+                prepend_source=self.settings.chunk_prepend_source,
             )
 
         logger.info("Docling converter loaded.")
 
     async def parse(
         self,
-        content: bytes,
+        content: Optional[bytes],
         filename: str,
         extract_tables: bool = True,
         extract_images: bool = True,
         output_format: str = "markdown",
+        path: Optional[str] = None,
     ) -> ParseResponse:
+        """Parse `content`, or the file at `path` (e.g. a spooled upload) when given."""
         ext = Path(filename).suffix.lower()
         if ext not in self.SUPPORTED_EXTENSIONS:
             raise ValueError(f"Unsupported file type: {ext}")
 
-        return await asyncio.get_event_loop().run_in_executor(
-            None,
-            self._parse_sync,
-            content,
-            filename,
-            extract_tables,
-            extract_images,
-            output_format,
-        )
+        return await self._run(path or content, filename, extract_tables, extract_images, output_format)
+
+    async def _run(self, source: bytes | str, *args) -> ParseResponse:
+        """
+        Run _parse_sync in the process pool if enabled, else on a thread.
+        `source` is the document bytes or a file path; pool workers given a
+        path open the file themselves, so nothing large crosses the pipe.
+        """
+        loop = asyncio.get_event_loop()
+        if not self._pool:
+            return await loop.run_in_executor(None, self._parse_sync, source, *args)
+        return await loop.run_in_executor(self._pool, _parse_in_worker, source, *args)
 
     def _parse_sync(
         self,
-        content: bytes,
+        source: bytes | str,
         filename: str,
         extract_tables: bool,
         extract_images: bool,
         output_format: str,
     ) -> ParseResponse:
-        with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix, delete=False) as tmp:
-            tmp.write(content)
-            tmp_path = Path(tmp.name)
-
-        try:
-            result = self._converter.convert(tmp_path)
-            doc = result.document
-
-            # ── Markdown ──────────────────────────────────────────────────────
-            markdown = doc.export_to_markdown()
-
-            # ── Tables ────────────────────────────────────────────────────────
-            tables: list[TableData] = []
-            if extract_tables:
-                for tbl in doc.tables:
-                    try:
-                        df = tbl.export_to_dataframe()
-                        tables.append(TableData(
-                            caption=tbl.caption_text(doc) if hasattr(tbl, "caption_text") else None,
-                            headers=list(df.columns),
-                            rows=df.values.tolist(),
-                            markdown=df.to_markdown(index=False),
-                        ))
-                    except Exception as e:
-                        logger.warning(f"Failed to extract table: {e}")
-
-            # ── Metadata ──────────────────────────────────────────────────────
-            num_pages = None
-            if hasattr(doc, 'num_pages'):
-                np = doc.num_pages
-                num_pages = np() if callable(np) else np
-            metadata = {
-                "num_pages": num_pages,
-                "num_tables": len(tables),
-                "filename": filename,
-            }
+        from docling.datamodel.base_models import DocumentStream
 
-            # ── Chunks ────────────────────────────────────────────────────────
-            chunks: list[DocumentChunk] = []
-            if self._chunker:
-                chunks = self._chunker.chunk(markdown)
-
-            # ── Build Response ────────────────────────────────────────────────
-            raw = None
-            if output_format == "json":
-                raw = json.loads(doc.export_to_dict() if hasattr(doc, "export_to_dict") else "{}")
-
-            return ParseResponse(
-                source=filename,
-                content_type="document",
-                markdown=markdown,
-                chunks=chunks,
-                tables=tables,
-                metadata=metadata,
-                raw=raw,
-            )
-        finally:
-            tmp_path.unlink(missing_ok=True)
+        if isinstance(source, str):
+            # Spooled uploads keep the original suffix, so Docling detects the format
+            result = self._converter.convert(Path(source))
+        else:
+            # Hand Docling the bytes in memory — no temp-file write/read round-trip
+            result = self._converter.convert(DocumentStream(name=filename, stream=io.BytesIO(source)))
+        doc = result.document
+
+        # ── Markdown ──────────────────────────────────────────────────────────
+        markdown = doc.export_to_markdown()
+
+        # ── Tables ────────────────────────────────────────────────────────────
+        tables: list[TableData] = []
+        if extract_tables:
+            for tbl in doc.tables:
+                try:
+                    df = tbl.export_to_dataframe()
+                    # One pass over the cells builds both rows and markdown (no tabulate)
+                    headers = [str(h) for h in df.columns]
+                    rows = [[str(c) for c in r] for r in df.itertuples(index=False, name=None)]
+                    md_lines = [
+                        "| " + " | ".join(headers) + " |",
+                        "|" + "|".join(["---"] * len(headers)) + "|",
+                    ]
+                    md_lines.extend("| " + " | ".join(r) + " |" for r in rows)
+                    tables.append(TableData(
+                        caption=tbl.caption_text(doc) if hasattr(tbl, "caption_text") else None,
+                        headers=headers,
+                        rows=rows,
+                        markdown="\n".join(md_lines),
+                    ))
+                except Exception as e:
+                    logger.warning(f"Failed to extract table: {e}")
+
+        # ── Metadata ──────────────────────────────────────────────────────────
+        num_pages = None
+        if hasattr(doc, 'num_pages'):
+            np = doc.num_pages
+            num_pages = np() if callable(np) else np
+        metadata = {
+            "num_pages": num_pages,
+            "num_tables": len(tables),
+            "filename": filename,
+        }
+
+        # ── Chunks ────────────────────────────────────────────────────────────
+        chunks: list[DocumentChunk] = []
+        if self._chunker:
+            chunks = self._chunker.chunk(markdown, source_title=filename)
+
+        # ── Build Response ────────────────────────────────────────────────────
+        raw = None
+        if output_format == "json":
+            raw = json.loads(doc.export_to_dict() if hasattr(doc, "export_to_dict") else "{}")
+
+        return ParseResponse.model_construct(
+            source=filename,
+            content_type="document",
+            markdown=markdown,
+            chunks=chunks,
+            tables=tables,
+            metadata=metadata,
+            raw=raw,
+        )
 
     async def parse_streaming(
         self,
-        content: bytes,
+        content: Optional[bytes],
         filename: str,
         extract_tables: bool = True,
+        path: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """Yield parsed page chunks as JSON strings for SSE streaming."""
         import json
 
-        result = await asyncio.get_event_loop().run_in_executor(
-            None, self._parse_sync, content, filename, extract_tables, False, "markdown"
-        )
+        result = await self._run(path or content, filename, extract_tables, False, "markdown")
 
         # Yield chunk-by-chunk
         if result.chunks:
@@ -185,5 +243,9 @@ class DocumentParser:
         yield json.dumps({"type": "metadata", "data": result.metadata})
 
     async def cleanup(self):
+        if self._pool:
+            await asyncio.get_event_loop().run_in_executor(None, self._pool.shutdown)
+            self._pool = None
         self._converter = None
         self._chunker = None
+        flush_gpu_cache()
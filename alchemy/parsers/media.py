@@ -10,14 +10,20 @@ Replaces Whisper Small with:
 
 from __future__ import annotations
 import asyncio
+import base64
+import bisect
+import io
+import itertools
+import json
 import logging
-import os
 import tempfile
+import threading
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 from alchemy.config import Settings
 from alchemy.schemas import ParseResponse
+from alchemy.utils.gpu import flush_gpu_cache, offload_to_cpu
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,9 @@ logger = logging.getLogger(__name__)
 class MediaParser:
     AUDIO_EXTENSIONS = {".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a"}
     VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm"}
+    SAMPLE_RATE = 16000   # Whisper's native input rate
+    SPOOL_MAX_BYTES = 64 << 20   # uploads above this spill to a temp file
+    KEYFRAME_WIDTH = 512         # keyframes are downscaled to this width
 
     def __init__(self, settings: Settings):
         self.settings = settings
@@ -44,7 +53,7 @@ class MediaParser:
 
         compute_type = self.settings.whisper_compute_type
         if device == "cpu":
-            compute_type = "int8"   # float16 not supported on CPU
+            compute_type = "int8"   # fp16 activations not supported on CPU
 
         logger.info(f"Loading {self.settings.whisper_model} on {device} ({compute_type})...")
         self._whisper = WhisperModel(
@@ -72,169 +81,292 @@ class MediaParser:
     # ── Audio ─────────────────────────────────────────────────────────────────
     async def parse_audio(
         self,
-        content: bytes,
+        content: Optional[bytes],
         filename: str,
         language: Optional[str] = None,
         diarize: bool = False,
+        path: Optional[str] = None,
     ) -> ParseResponse:
+        """Transcribe `content`, or the file at `path` (e.g. a spooled upload) when given."""
         return await asyncio.get_event_loop().run_in_executor(
-            None, self._transcribe, content, filename, language, diarize
+            None, self._transcribe, path or content, filename, language, diarize
         )
 
+    async def parse_audio_streaming(
+        self,
+        content: Optional[bytes],
+        filename: str,
+        language: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Yield transcript segments as JSON strings for SSE streaming, as they decode."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def _produce():
+            buf = None
+            if path is None:
+                buf = tempfile.SpooledTemporaryFile(
+                    max_size=self.SPOOL_MAX_BYTES, suffix=Path(filename).suffix
+                )
+            try:
+                if buf is not None:
+                    buf.write(content)
+                    buf.seek(0)
+                segments, info = self._whisper.transcribe(
+                    path or buf, **self._transcribe_kwargs(language)
+                )
+                # faster-whisper decodes lazily — each iteration runs the next window
+                for seg in segments:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, seg)
+                return info
+            finally:
+                if buf is not None:
+                    buf.close()
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, _produce)
+        full_parts: list[str] = []
+        try:
+            while (seg := await queue.get()) is not done:
+                full_parts.append(seg.text.strip())
+                yield json.dumps({
+                    "type": "segment",
+                    "data": {"start": seg.start, "end": seg.end, "text": seg.text},
+                })
+            info = await producer
+        finally:
+            stop.set()   # client went away — stop decoding further windows
+
+        yield json.dumps({"type": "full_text", "data": " ".join(full_parts)})
+        yield json.dumps({"type": "metadata", "data": {
+            "language": info.language,
+            "language_probability": round(info.language_probability, 3),
+            "duration_seconds": round(info.duration, 2),
+            "num_segments": len(full_parts),
+            "model": self.settings.whisper_model,
+        }})
+
     # ── Video ─────────────────────────────────────────────────────────────────
     async def parse_video(
         self,
-        content: bytes,
+        content: Optional[bytes],
         filename: str,
         language: Optional[str] = None,
         diarize: bool = False,
         extract_frames: bool = False,
+        path: Optional[str] = None,
     ) -> ParseResponse:
+        """Parse `content`, or the file at `path` (e.g. a spooled upload) when given."""
         return await asyncio.get_event_loop().run_in_executor(
-            None, self._parse_video_sync, content, filename, language, diarize, extract_frames
+            None, self._parse_video_sync, path or content, filename, language, diarize,
+            extract_frames,
         )
 
     # ── Internals ─────────────────────────────────────────────────────────────
     def _transcribe(
         self,
-        content: bytes,
+        source: bytes | str,
+        filename: str,
+        language: Optional[str],
+        diarize: bool,
+    ) -> ParseResponse:
+        if isinstance(source, str):
+            # Whisper and pyannote both read straight from a file path
+            return self._transcribe_source(source, source, filename, language, diarize)
+        # Short clips stay in memory; only large uploads spill to disk
+        with tempfile.SpooledTemporaryFile(
+            max_size=self.SPOOL_MAX_BYTES, suffix=Path(filename).suffix
+        ) as buf:
+            buf.write(source)
+            buf.seek(0)
+            return self._transcribe_source(buf, buf, filename, language, diarize)
+
+    def _transcribe_array(
+        self,
+        audio,
+        filename: str,
+        language: Optional[str],
+        diarize: bool,
+    ) -> ParseResponse:
+        """Transcribe 16 kHz mono float32 PCM that is already in memory."""
+        diarize_input = None
+        if diarize and self._diarizer:
+            import torch
+            # pyannote accepts an in-memory waveform of shape (channel, time)
+            diarize_input = {
+                "waveform": torch.from_numpy(audio).unsqueeze(0),
+                "sample_rate": self.SAMPLE_RATE,
+            }
+        return self._transcribe_source(audio, diarize_input, filename, language, diarize)
+
+    def _transcribe_source(
+        self,
+        audio,
+        diarize_input,
         filename: str,
         language: Optional[str],
         diarize: bool,
     ) -> ParseResponse:
-        suffix = Path(filename).suffix
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
+        """Run Whisper over a file object or PCM array and build the response."""
+        segments, info = self._whisper.transcribe(audio, **self._transcribe_kwargs(language))
 
-        try:
-            segments, info = self._whisper.transcribe(
-                tmp_path,
-                language=language,
-                beam_size=5,
-                vad_filter=True,                    # skip silence
-                vad_parameters={"min_silence_duration_ms": 500},
-                batch_size=self.settings.whisper_batch_size,
-            )
-
-            segment_list = list(segments)   # materialise generator
-
-            if diarize and self._diarizer:
-                transcript = self._diarize_transcript(tmp_path, segment_list)
-            else:
-                transcript = self._plain_transcript(segment_list)
-
-            # Full plain text
-            full_text = " ".join(s.text.strip() for s in segment_list)
-
-            return ParseResponse(
-                source=filename,
-                content_type="audio",
-                markdown=transcript,
-                metadata={
-                    "language": info.language,
-                    "language_probability": round(info.language_probability, 3),
-                    "duration_seconds": round(info.duration, 2),
-                    "num_segments": len(segment_list),
-                    "model": self.settings.whisper_model,
-                    "diarized": diarize and self._diarizer is not None,
-                },
-                raw={"full_text": full_text, "segments": [
-                    {"start": s.start, "end": s.end, "text": s.text}
-                    for s in segment_list
-                ]},
-            )
-        finally:
-            os.unlink(tmp_path)
+        speaker_at = None
+        if diarize and self._diarizer:
+            if hasattr(diarize_input, "seek"):
+                diarize_input.seek(0)   # Whisper already read the shared buffer
+            speaker_at = self._speaker_lookup(diarize_input)
 
-    def _plain_transcript(self, segments) -> str:
-        lines = []
+        # Single pass over the segment generator builds transcript, text and raw segments
+        lines, full_parts, segments_raw = [], [], []
         for seg in segments:
-            start = self._fmt_time(seg.start)
-            end = self._fmt_time(seg.end)
-            lines.append(f"[{start} → {end}] {seg.text.strip()}")
-        return "\n".join(lines)
-
-    def _diarize_transcript(self, audio_path: str, segments) -> str:
-        """Merge Whisper segments with pyannote speaker labels."""
-        diarization = self._diarizer(audio_path)
-        lines = []
-        for seg in segments:
-            mid = (seg.start + seg.end) / 2
-            speaker = "UNKNOWN"
-            for turn, _, spk in diarization.itertracks(yield_label=True):
-                if turn.start <= mid <= turn.end:
-                    speaker = spk
-                    break
-            start = self._fmt_time(seg.start)
-            end = self._fmt_time(seg.end)
-            lines.append(f"[{start} → {end}] **{speaker}**: {seg.text.strip()}")
-        return "\n".join(lines)
+            text = seg.text.strip()
+            full_parts.append(text)
+            segments_raw.append({"start": seg.start, "end": seg.end, "text": seg.text})
+            span = f"[{self._fmt_time(seg.start)} → {self._fmt_time(seg.end)}]"
+            if speaker_at:
+                lines.append(f"{span} **{speaker_at((seg.start + seg.end) / 2)}**: {text}")
+            else:
+                lines.append(f"{span} {text}")
+        transcript = "\n".join(lines)
+        full_text = " ".join(full_parts)
+
+        return ParseResponse(
+            source=filename,
+            content_type="audio",
+            markdown=transcript,
+            metadata={
+                "language": info.language,
+                "language_probability": round(info.language_probability, 3),
+                "duration_seconds": round(info.duration, 2),
+                "num_segments": len(segments_raw),
+                "model": self.settings.whisper_model,
+                "diarized": diarize and self._diarizer is not None,
+            },
+            raw={"full_text": full_text, "segments": segments_raw},
+        )
+
+    def _transcribe_kwargs(self, language: Optional[str]) -> dict[str, Any]:
+        return dict(
+            language=language,
+            beam_size=self.settings.whisper_beam_size,
+            # Don't feed prior text back in — avoids context growth on long files
+            condition_on_previous_text=self.settings.whisper_condition_on_previous,
+            vad_filter=True,                    # skip silence
+            vad_parameters={"min_silence_duration_ms": 500},
+            batch_size=self.settings.whisper_batch_size,
+        )
+
+    def _speaker_lookup(self, audio):
+        """Run pyannote and return a `time → speaker label` lookup."""
+        diarization = self._diarizer(audio)
+        # Sort turns once and binary-search each segment midpoint: O(N log M)
+        turns = sorted(
+            ((turn.start, turn.end, spk) for turn, _, spk in diarization.itertracks(yield_label=True)),
+            key=lambda t: t[0],
+        )
+        starts = [t[0] for t in turns]
+        # Running max of turn ends: turns overlap under crosstalk, so the
+        # latest-starting turn before t may have ended while an earlier one
+        # still covers t. Scan back only while some earlier turn can reach t.
+        max_ends = list(itertools.accumulate((t[1] for t in turns), max))
+
+        def speaker_at(t: float) -> str:
+            i = bisect.bisect_right(starts, t) - 1
+            while i >= 0 and max_ends[i] >= t:
+                if turns[i][1] >= t:
+                    return turns[i][2]
+                i -= 1
+            return "UNKNOWN"
+
+        return speaker_at
 
     def _parse_video_sync(
         self,
-        content: bytes,
+        source: bytes | str,
         filename: str,
         language: Optional[str],
         diarize: bool,
         extract_frames: bool,
     ) -> ParseResponse:
         """Extract audio from video, transcribe, and optionally caption keyframes."""
-        import subprocess
+        # PyAV demuxes/decodes in-process straight from memory or the spooled
+        # upload — no ffmpeg subprocess spawn, no temp video file, no .wav
+        audio = self._decode_audio(self._open_source(source))
 
-        suffix = Path(filename).suffix
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(content)
-            video_path = tmp.name
-
-        audio_path = video_path + ".wav"
-        try:
-            # Extract audio with ffmpeg
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", video_path, "-vn", "-acodec", "pcm_s16le", "-ar", "16000", audio_path],
-                check=True,
-                capture_output=True,
-            )
+        result = self._transcribe_array(audio, filename, language, diarize)
+        result.content_type = "video"
 
-            with open(audio_path, "rb") as f:
-                audio_bytes = f.read()
+        # Keyframe extraction (frames can be captioned via /parse/image)
+        if extract_frames:
+            frames_info = self._extract_keyframes(self._open_source(source))
+            result.metadata["keyframes"] = frames_info
 
-            result = self._transcribe(audio_bytes, filename, language, diarize)
-            result.content_type = "video"
+        return result
 
-            # Keyframe extraction (uses ffmpeg + VLM caption via image parser if loaded)
-            if extract_frames:
-                frames_info = self._extract_keyframes(video_path)
-                result.metadata["keyframes"] = frames_info
-
-            return result
-        finally:
-            os.unlink(video_path)
-            if os.path.exists(audio_path):
-                os.unlink(audio_path)
-
-    def _extract_keyframes(self, video_path: str, fps: float = 0.1) -> list[dict]:
-        """Extract one frame every 10 seconds using ffmpeg."""
-        import subprocess, glob
-
-        frame_dir = tempfile.mkdtemp()
-        subprocess.run(
-            [
-                "ffmpeg", "-y", "-i", video_path,
-                "-vf", f"fps={fps}",
-                os.path.join(frame_dir, "frame_%04d.jpg"),
-            ],
-            capture_output=True,
-        )
+    @staticmethod
+    def _open_source(source: bytes | str):
+        """A file path is opened by PyAV itself; raw bytes get a fresh buffer per read."""
+        return source if isinstance(source, str) else io.BytesIO(source)
+
+    def _decode_audio(self, source):
+        """Decode the first audio track to 16 kHz mono float32 PCM."""
+        import av
+        import numpy as np
+
+        chunks = []
+        with av.open(source) as container:
+            stream = next((s for s in container.streams if s.type == "audio"), None)
+            if stream is None:
+                raise ValueError("No audio track found in video.")
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=self.SAMPLE_RATE)
+            for frame in container.decode(stream):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray().reshape(-1))
+            for out in resampler.resample(None):   # flush buffered samples
+                chunks.append(out.to_ndarray().reshape(-1))
+
+        pcm = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+        return pcm.astype(np.float32) / 32768.0
+
+    def _extract_keyframes(self, source, scene_threshold: float = 0.15) -> list[dict]:
+        """
+        Extract scene-change keyframes, decoding only I-frames.
+
+        A keyframe is kept when its mean absolute luma difference (0-1) from the
+        last kept frame exceeds `scene_threshold`. Frames are JPEG-encoded in
+        memory and returned inline (base64), so nothing is left on disk.
+        """
+        import av
+        import numpy as np
 
-        frames = sorted(glob.glob(os.path.join(frame_dir, "*.jpg")))
         results = []
-        for i, fpath in enumerate(frames):
-            results.append({
-                "index": i,
-                "timestamp_approx_s": round(i / fps),
-                "path": fpath,   # downstream can caption these via /parse/image
-            })
+        last = None
+        with av.open(source) as container:
+            stream = container.streams.video[0]
+            stream.codec_context.skip_frame = "NONKEY"   # never decode non-key frames
+            for frame in container.decode(stream):
+                image = frame.to_image()
+                thumb = np.asarray(image.convert("L").resize((64, 64)), dtype=np.float32)
+                if last is not None and np.abs(thumb - last).mean() / 255 < scene_threshold:
+                    continue
+                last = thumb
+
+                if image.width > self.KEYFRAME_WIDTH:
+                    height = round(image.height * self.KEYFRAME_WIDTH / image.width)
+                    image = image.resize((self.KEYFRAME_WIDTH, height))
+                jpeg = io.BytesIO()
+                image.save(jpeg, format="JPEG", quality=85)
+                results.append({
+                    "index": len(results),
+                    "timestamp_approx_s": round(frame.time, 2) if frame.time is not None else None,
+                    # downstream can caption these via /parse/image
+                    "image_base64": base64.b64encode(jpeg.getvalue()).decode("ascii"),
+                })
         return results
 
     @staticmethod
@@ -244,5 +376,10 @@ class MediaParser:
         return f"{h:02d}:{m:02d}:{s:02d}"
 
     async def cleanup(self):
+        # Offload, then drop every reference so empty_cache() can free the weights
+        diarizer = self._diarizer
         self._whisper = None
         self._diarizer = None
+        offload_to_cpu(diarizer)
+        del diarizer
+        flush_gpu_cache()
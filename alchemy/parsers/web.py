@@ -12,10 +12,22 @@ web crawler that:
 
 from __future__ import annotations
 import asyncio
+import hashlib
+import inspect
 import json
 import logging
 from typing import Any, Optional
 
+from cachetools import TTLCache
+from crawl4ai import (
+    AsyncWebCrawler,
+    BrowserConfig,
+    CacheMode,
+    CrawlerRunConfig,
+    SemaphoreDispatcher,
+)
+from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
 from alchemy.config import Settings
 from alchemy.schemas import ParseResponse, DocumentChunk
 from alchemy.utils.chunker import SemanticChunker
@@ -24,24 +36,48 @@ logger = logging.getLogger(__name__)
 
 
 class WebParser:
+    # Internal links followed per page when max_depth > 1
+    MAX_LINKS_PER_PAGE = 5
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self._crawler = None
         self._chunker: Optional[SemanticChunker] = None
+        # Recent results keyed by request; web_cache_ttl=0 disables caching
+        self._cache: Optional[TTLCache] = None
+        if settings.web_cache_ttl > 0:
+            self._cache = TTLCache(maxsize=settings.web_cache_size, ttl=settings.web_cache_ttl)
+        self._inflight: dict[str, asyncio.Task] = {}
 
     async def initialize(self):
-        from crawl4ai import AsyncWebCrawler
-        self._crawler = AsyncWebCrawler(
+        browser_config = BrowserConfig(
             headless=True,
             verbose=False,
             user_agent=self.settings.crawler_user_agent,
+            # A persistent profile keeps Chromium's HTTP/JS caches across restarts
+            use_persistent_context=self.settings.crawler_data_dir is not None,
+            user_data_dir=self.settings.crawler_data_dir,
+            **self._blocking_options(),
         )
+        self._crawler = AsyncWebCrawler(config=browser_config)
         await self._crawler.start()
 
+        # Render one blank page so the first real request doesn't pay for
+        # context and page creation
+        try:
+            await self._crawler.arun(
+                url="raw:<html><body></body></html>",
+                config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+            )
+        except Exception as e:
+            logger.warning(f"Crawler warm-up failed: {e}")
+
         if self.settings.semantic_chunking:
             self._chunker = SemanticChunker(
                 chunk_size=self.settings.chunk_size,
                 chunk_overlap=self.settings.chunk_overlap,
+                prepend_title=self.settings.chunk_prepend_title,
+                prepend_source=self.settings.chunk_prepend_source,
             )
         logger.info("Crawl4AI crawler warmed up.")
 
@@ -54,14 +90,35 @@ class WebParser:
         headers: Optional[dict] = None,
     ) -> ParseResponse:
         """Crawl a URL and return structured markdown + optional extracted data."""
-        from crawl4ai import CrawlerRunConfig, CacheMode
-        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy, LLMExtractionStrategy
+        url = self._normalize_url(url)
+        key = self._cache_key(url, max_depth, css_selector, extraction_schema)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
 
-        # Auto-fix URLs missing scheme
-        url = url.strip()
-        if not url.startswith(("http://", "https://", "file://", "raw:")):
-            url = "https://" + url
+        # Concurrent requests for the same page share one crawl. The crawl runs
+        # as its own task so a cancelled caller doesn't abort it for the others.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._parse(url, max_depth, css_selector, extraction_schema)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        response = await asyncio.shield(task)
 
+        if self._cache is not None:
+            self._cache[key] = response
+        return response
+
+    async def _parse(
+        self,
+        url: str,
+        max_depth: int,
+        css_selector: Optional[str],
+        extraction_schema: Optional[dict],
+    ) -> ParseResponse:
         # Build extraction strategy
         extraction_strategy = None
         if extraction_schema:
@@ -69,16 +126,7 @@ class WebParser:
 
         # In Crawl4AI v0.8.0, headers belong on BrowserConfig, not CrawlerRunConfig.
         # We pass them at crawler init time, so ignore per-request headers here.
-        # Use "domcontentloaded" instead of "networkidle" — heavy sites with ads/trackers
-        # never reach network-idle and will always time out.
-        config = CrawlerRunConfig(
-            cache_mode=CacheMode.BYPASS,
-            css_selector=css_selector,
-            extraction_strategy=extraction_strategy,
-            page_timeout=60000,  # 60s — generous for JS-heavy pages
-            wait_until="domcontentloaded",
-            delay_before_return_html=2.0,  # wait 2s after DOM ready for JS to render
-        )
+        config = self._run_config(css_selector, extraction_strategy)
 
         try:
             result = await self._crawler.arun(url=url, config=config)
@@ -88,15 +136,12 @@ class WebParser:
         if not result.success:
             raise RuntimeError(f"Crawl failed for {url}: {result.error_message}")
 
-        markdown = result.markdown_v2.raw_markdown if hasattr(result, "markdown_v2") else result.markdown
-
-        # Clean markdown
-        markdown = markdown.strip() if markdown else ""
+        markdown = self._markdown_of(result)
 
         # Semantic chunks
         chunks: list[DocumentChunk] = []
         if self._chunker and markdown:
-            chunks = self._chunker.chunk(markdown)
+            chunks = self._chunker.chunk(markdown, source_title=url)
 
         # Structured extraction
         raw = None
@@ -108,19 +153,12 @@ class WebParser:
 
         # Follow links up to max_depth
         pages: list[dict] = [{"url": url, "markdown": markdown}]
-        if max_depth > 1 and result.links:
-            internal_links = [lnk["href"] for lnk in result.links.get("internal", [])[:5]]
-            sub_results = await asyncio.gather(
-                *[
-                    self.parse(link, max_depth=max_depth - 1, css_selector=css_selector)
-                    for link in internal_links
-                ],
-                return_exceptions=True,
-            )
-            for sub in sub_results:
-                if isinstance(sub, ParseResponse):
-                    pages.append({"url": sub.source, "markdown": sub.markdown})
-                    chunks.extend(sub.chunks)
+        if max_depth > 1:
+            for sub in await self._crawl_bfs(url, result, max_depth, self._run_config(css_selector)):
+                sub_markdown = self._markdown_of(sub)
+                pages.append({"url": sub.url, "markdown": sub_markdown})
+                if self._chunker and sub_markdown:
+                    chunks.extend(self._chunker.chunk(sub_markdown, source_title=sub.url))
 
         # Merge pages into one markdown document
         if len(pages) > 1:
@@ -130,7 +168,7 @@ class WebParser:
         else:
             merged = markdown
 
-        return ParseResponse(
+        return ParseResponse.model_construct(
             source=url,
             content_type="web",
             markdown=merged,
@@ -143,21 +181,132 @@ class WebParser:
             raw=raw,
         )
 
-    async def parse_many(self, urls: list[str]) -> list[ParseResponse]:
-        """Crawl multiple URLs concurrently (up to crawler_max_concurrent)."""
-        sem = asyncio.Semaphore(self.settings.crawler_max_concurrent)
+    @staticmethod
+    def _cache_key(
+        url: str,
+        max_depth: int,
+        css_selector: Optional[str],
+        extraction_schema: Optional[dict],
+    ) -> str:
+        raw = json.dumps([url, max_depth, css_selector, extraction_schema], sort_keys=True)
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        # Auto-fix URLs missing scheme
+        url = url.strip()
+        if not url.startswith(("http://", "https://", "file://", "raw:")):
+            url = "https://" + url
+        return url
 
-        async def _bounded(url: str) -> ParseResponse:
-            async with sem:
-                return await self.parse(url)
+    @staticmethod
+    def _run_config(css_selector: Optional[str] = None, extraction_strategy=None) -> CrawlerRunConfig:
+        # Use "domcontentloaded" instead of "networkidle" — heavy sites with ads/trackers
+        # never reach network-idle and will always time out.
+        return CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            css_selector=css_selector,
+            extraction_strategy=extraction_strategy,
+            page_timeout=60000,  # 60s — generous for JS-heavy pages
+            wait_until="domcontentloaded",
+            delay_before_return_html=2.0,  # wait 2s after DOM ready for JS to render
+        )
+
+    def _blocking_options(self) -> dict[str, bool]:
+        """
+        Only result.markdown is consumed, so ads, trackers and CSS are blocked
+        at the network layer unless explicitly re-enabled. Older Crawl4AI
+        releases lack these BrowserConfig options; they are skipped there.
+        """
+        wanted = {
+            "avoid_ads": self.settings.crawler_block_ads,
+            "avoid_css": self.settings.crawler_block_css,
+        }
+        accepted = inspect.signature(BrowserConfig).parameters
+        unsupported = [k for k, on in wanted.items() if on and k not in accepted]
+        if unsupported:
+            logger.info(f"Crawl4AI BrowserConfig lacks {unsupported}; not blocking those requests.")
+        return {k: v for k, v in wanted.items() if k in accepted}
+
+    @staticmethod
+    def _markdown_of(result) -> str:
+        markdown = result.markdown_v2.raw_markdown if hasattr(result, "markdown_v2") else result.markdown
+        # Clean markdown
+        return markdown.strip() if markdown else ""
+
+    async def _crawl_bfs(self, seed: str, seed_result, max_depth: int, config) -> list:
+        """
+        Breadth-first crawl of internal links below an already-fetched seed page.
+        Each URL is visited at most once; each frontier is fetched with arun_many
+        in batches of crawler_max_concurrent. Failed pages are skipped.
+        """
+        visited = {seed}
+        results = []
+        level = [seed_result]
+        batch_size = self.settings.crawler_max_concurrent
+
+        for _ in range(max_depth - 1):
+            frontier: list[str] = []
+            for res in level:
+                if not res.links:
+                    continue
+                for lnk in res.links.get("internal", [])[: self.MAX_LINKS_PER_PAGE]:
+                    href = lnk.get("href")
+                    if href and href not in visited:
+                        visited.add(href)
+                        frontier.append(href)
+            if not frontier:
+                break
+
+            level = []
+            for i in range(0, len(frontier), batch_size):
+                batch = frontier[i : i + batch_size]
+                try:
+                    batch_results = await self._crawler.arun_many(urls=batch, config=config)
+                except Exception as e:
+                    logger.warning(f"Failed to crawl {batch}: {e}")
+                    continue
+                for res in batch_results:
+                    if res.success:
+                        level.append(res)
+                    else:
+                        logger.warning(f"Failed to crawl {res.url}: {res.error_message}")
+            results.extend(level)
+
+        return results
+
+    async def parse_many(self, urls: list[str]) -> list[ParseResponse]:
+        """
+        Crawl multiple URLs in one arun_many call, sharing the warmed browser
+        across pages. Concurrency is capped at crawler_max_concurrent.
+        Failed URLs are logged and dropped from the output.
+        """
+        urls = [self._normalize_url(u) for u in urls]
+        dispatcher = SemaphoreDispatcher(semaphore_count=self.settings.crawler_max_concurrent)
+        results = await self._crawler.arun_many(
+            urls=urls, config=self._run_config(), dispatcher=dispatcher
+        )
 
-        results = await asyncio.gather(*[_bounded(u) for u in urls], return_exceptions=True)
         output = []
-        for url, res in zip(urls, results):
-            if isinstance(res, Exception):
-                logger.warning(f"Failed to crawl {url}: {res}")
-            else:
-                output.append(res)
+        for res in results:
+            if not res.success:
+                logger.warning(f"Failed to crawl {res.url}: {res.error_message}")
+                continue
+            markdown = self._markdown_of(res)
+            chunks = []
+            if self._chunker and markdown:
+                chunks = self._chunker.chunk(markdown, source_title=res.url)
+            output.append(ParseResponse.model_construct(
+                source=res.url,
+                content_type="web",
+                markdown=markdown,
+                chunks=chunks,
+                metadata={
+                    "num_pages_crawled": 1,
+                    "links_found": len(res.links.get("internal", [])) if res.links else 0,
+                    "status_code": res.status_code,
+                },
+            ))
         return output
 
     async def cleanup(self):
@@ -0,0 +1,163 @@
+"""
+Offline Batch Runner
+--------------------
+Bulk ingestion that stays off the interactive job queue.
+- Each batch is a JSONL file under the configured batch directory, one
+  parse request per line. Every path (input, output, per-line "path") must
+  resolve inside that directory.
+- Batches run in-process against the shared ModelManager, one at a time and
+  one item at a time, so bulk work never takes live queue slots or loads a
+  second copy of the models.
+- Results are written line by line to an output JSONL file; a bad line is
+  recorded as a failed item rather than aborting the batch.
+
+Input line format:
+    {"custom_id": "a", "task": "parse_document", "path": "docs/a.pdf", "output_format": "markdown"}
+    {"custom_id": "b", "task": "parse_web", "url": "https://example.com", "max_depth": 2}
+    {"custom_id": "c", "task": "parse_image", "path": "images/c.png", "image_task": "ocr"}
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, TYPE_CHECKING
+
+from cachetools import TTLCache
+
+from alchemy.schemas import JobStatus
+
+if TYPE_CHECKING:
+    from alchemy.queue.worker import JobQueue
+
+logger = logging.getLogger(__name__)
+
+# Tasks whose input is a file on disk (read from "path") rather than a URL
+FILE_TASKS = {"parse_document", "parse_image", "parse_audio", "parse_video"}
+
+
+@dataclass
+class Batch:
+    id: str
+    input_path: str
+    output_path: str
+    status: JobStatus = JobStatus.PENDING
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        queue_for: Callable[[str], "JobQueue"],
+        batch_dir: str,
+        max_batches: int = 1024,
+        batch_ttl: float = 3600,
+    ):
+        self._queue_for = queue_for
+        self._root = Path(batch_dir).resolve()
+        self._slot = asyncio.Semaphore(1)     # one batch at a time
+        # Pending/running batches stay put; finished ones expire like jobs
+        self._active: dict[str, Batch] = {}
+        self._finished: TTLCache[str, Batch] = TTLCache(maxsize=max_batches, ttl=batch_ttl)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def submit(self, input_path: str, output_path: Optional[str] = None) -> Batch:
+        """
+        Start a batch. Raises ValueError for paths outside the batch directory
+        and FileNotFoundError for a missing input file.
+        """
+        src = self._resolve(input_path.removeprefix("file://"))
+        if not src.is_file():
+            raise FileNotFoundError(f"Batch input not found: {input_path}")
+        batch_id = str(uuid.uuid4())
+        if output_path:
+            dst = self._resolve(output_path)
+        else:
+            dst = src.with_name(f"{src.stem}.{batch_id}.out.jsonl")
+        batch = Batch(id=batch_id, input_path=str(src), output_path=str(dst))
+        self._active[batch_id] = batch
+        self._tasks[batch_id] = asyncio.create_task(
+            self._run(batch), name=f"alchemy-batch-{batch_id}"
+        )
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[Batch]:
+        return self._active.get(batch_id) or self._finished.get(batch_id)
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _resolve(self, path: str) -> Path:
+        """Resolve `path` against the batch directory, refusing anything outside it."""
+        resolved = (self._root / path).resolve()
+        if not resolved.is_relative_to(self._root):
+            raise ValueError(f"Path is outside the batch directory: {path}")
+        return resolved
+
+    async def _run(self, batch: Batch):
+        try:
+            async with self._slot:
+                batch.status = JobStatus.RUNNING
+                done, failed = await self._run_items(batch)
+            batch.status = JobStatus.DONE
+            logger.info(
+                f"Batch {batch.id} complete: {done} done, {failed} failed → {batch.output_path}"
+            )
+        except asyncio.CancelledError:
+            batch.status = JobStatus.FAILED
+            batch.error = "Batch was cancelled (server shutdown)."
+            raise
+        except Exception as e:
+            logger.exception(f"Batch {batch.id} failed: {e}")
+            batch.status = JobStatus.FAILED
+            batch.error = str(e)
+        finally:
+            batch.completed_at = time.time()
+            self._tasks.pop(batch.id, None)
+            self._finished[batch.id] = self._active.pop(batch.id, batch)
+
+    async def _run_items(self, batch: Batch) -> tuple[int, int]:
+        from alchemy.queue.worker import Job, payload_from_dict
+
+        lines = (await asyncio.to_thread(Path(batch.input_path).read_text)).splitlines()
+        done = failed = 0
+        with open(batch.output_path, "w") as out:
+            for line_no, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                custom_id = str(line_no)
+                try:
+                    item = json.loads(line)
+                    custom_id = item.get("custom_id", custom_id)
+                    task = item["task"]
+                    fields = dict(item)
+                    path = None
+                    if task in FILE_TASKS:
+                        path = self._resolve(item["path"])
+                        fields.setdefault("filename", path.name)
+                    payload = payload_from_dict(task, fields)
+                    if path is not None:
+                        # In-memory bytes only: content_path would make the
+                        # queue delete the batch's input file when the job ends
+                        payload.content = await asyncio.to_thread(path.read_bytes)
+                    job = Job(id=f"{batch.id}:{custom_id}", task=task, payload=payload)
+                    result = await self._queue_for(task).run_detached(job)
+                    record = {
+                        "custom_id": custom_id,
+                        "status": "done",
+                        "result": result.model_dump(mode="json"),
+                    }
+                    done += 1
+                except Exception as e:
+                    record = {"custom_id": custom_id, "status": "failed", "error": str(e)}
+                    failed += 1
+                await asyncio.to_thread(out.write, json.dumps(record) + "\n")
+        return done, failed
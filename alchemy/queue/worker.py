@@ -5,87 +5,306 @@ A lightweight in-process job queue backed by asyncio.
 - Jobs are enqueued and processed by a pool of async workers.
 - Workers stay alive and share warm model references from ModelManager.
 - Supports both fire-and-forget (async_mode) and blocking (run_sync) usage.
+- Finished job records expire after a TTL so results don't pile up in memory.
+- Queued jobs are ordered by a coarse cost bucket (cheap first, FIFO within
+  a bucket) so small files aren't stuck behind large ones. Waiting ages a
+  job toward the front, so a stream of small uploads can't starve it.
+- The server runs one queue per task family (see TASK_FAMILIES) so a long
+  video transcription never occupies a document or web worker.
 """
 
 from __future__ import annotations
 import asyncio
+import itertools
 import logging
 import time
-from dataclasses import dataclass, field
-from typing import Any, Optional, TYPE_CHECKING
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Optional, TYPE_CHECKING, Union
 
-from alchemy.schemas import JobStatus
+import zstandard
+from cachetools import TTLCache
+
+from alchemy.schemas import JobStatus, ParseResponse
 
 if TYPE_CHECKING:
     from alchemy.models.manager import ModelManager
 
 logger = logging.getLogger(__name__)
 
+# Cost buckets: log16 of cost_hint — ~1 KB, 16 KB, 256 KB, 4 MB, 64 MB, 1 GB, ...
+NUM_COST_BUCKETS = 8
+
+
+# Seconds of waiting worth one cost bucket: a job is never passed by work
+# enqueued more than bucket × AGE_STEP_S after it (at most ~70 s behind)
+AGE_STEP_S = 10.0
+
+
+def cost_bucket(cost_hint: int) -> int:
+    return min(NUM_COST_BUCKETS - 1, cost_hint.bit_length() // 4)
+
+
+# Task → queue family; each family gets its own JobQueue and workers
+TASK_FAMILIES = {
+    "parse_document": "document",
+    "parse_image": "document",
+    "parse_audio": "media",
+    "parse_video": "media",
+    "parse_web": "web",
+}
+
+
+# Finished results with more markdown than this are kept zstd-compressed
+COMPRESS_MIN_CHARS = 64 * 1024
+_ZSTD_C = zstandard.ZstdCompressor(level=3)
+_ZSTD_D = zstandard.ZstdDecompressor()
+
+
+# ── Payloads ──────────────────────────────────────────────────────────────────
+# Slotted records rather than dicts: smaller per in-flight job, and a typo'd
+# field is an error at construction instead of a silently ignored key.
+@dataclass(slots=True)
+class UploadPayload:
+    filename: str
+    content_path: Optional[str] = None    # spooled upload, deleted when the job finishes
+    content: Optional[bytes] = None       # in-memory bytes (batch runner)
+
+
+@dataclass(slots=True)
+class DocPayload(UploadPayload):
+    content_type: Optional[str] = None
+    extract_tables: bool = True
+    extract_images: bool = True
+    output_format: str = "markdown"
+
+
+@dataclass(slots=True)
+class ImagePayload(UploadPayload):
+    image_task: str = "detailed_caption"
+    prompt: Optional[str] = None
+
+
+@dataclass(slots=True)
+class AudioPayload(UploadPayload):
+    language: Optional[str] = None
+    diarize: bool = False
+
+
+@dataclass(slots=True)
+class VideoPayload(AudioPayload):
+    extract_frames: bool = False
+
+
+@dataclass(slots=True)
+class WebPayload:
+    url: str
+    max_depth: int = 1
+    css_selector: Optional[str] = None
+    extraction_schema: Optional[dict] = None
+    headers: Optional[dict[str, str]] = None
+
+
+Payload = Union[DocPayload, ImagePayload, AudioPayload, VideoPayload, WebPayload]
+
+PAYLOAD_TYPES: dict[str, type] = {
+    "parse_document": DocPayload,
+    "parse_image": ImagePayload,
+    "parse_audio": AudioPayload,
+    "parse_video": VideoPayload,
+    "parse_web": WebPayload,
+}
+
+
+# Fields a caller may set from request data. The upload source (content /
+# content_path) is server-owned: content_path is deleted when the job ends.
+USER_FIELDS: dict[str, frozenset[str]] = {
+    task: frozenset(f.name for f in fields(cls)) - {"content", "content_path"}
+    for task, cls in PAYLOAD_TYPES.items()
+}
+
+
+def payload_from_dict(task: str, data: dict[str, Any]) -> Payload:
+    """Build the payload for `task` from a loose dict, keeping only USER_FIELDS."""
+    cls = PAYLOAD_TYPES.get(task)
+    if cls is None:
+        raise ValueError(f"Unknown task: {task}")
+    allowed = USER_FIELDS[task]
+    return cls(**{k: v for k, v in data.items() if k in allowed})
+
 
 @dataclass
 class Job:
     id: str
     task: str                            # parse_document | parse_image | parse_audio | parse_video | parse_web
-    payload: dict[str, Any]
+    payload: Payload
     status: JobStatus = JobStatus.PENDING
     result: Optional[Any] = None
     error: Optional[str] = None
+    cost_hint: int = 0                   # rough work estimate (upload bytes, crawl size)
     created_at: float = field(default_factory=time.time)
     completed_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
+    markdown_zst: Optional[bytes] = field(default=None, repr=False)
+
+    def compact(self):
+        """Move a large result's markdown into a compressed blob while it waits to be fetched."""
+        res = self.result
+        if (
+            isinstance(res, ParseResponse)
+            and res.markdown
+            and len(res.markdown) > COMPRESS_MIN_CHARS
+        ):
+            self.markdown_zst = _ZSTD_C.compress(res.markdown.encode())
+            # Copy rather than mutate — parsers may cache and share responses
+            self.result = res.model_copy(update={"markdown": None})
+
+    def get_result(self) -> Optional[Any]:
+        if self.markdown_zst is None:
+            return self.result
+        markdown = _ZSTD_D.decompress(self.markdown_zst).decode()
+        return self.result.model_copy(update={"markdown": markdown})
 
 
 class JobQueue:
-    def __init__(self, model_manager: "ModelManager", max_workers: int = 2):
+    def __init__(
+        self,
+        model_manager: "ModelManager",
+        max_workers: int = 2,
+        name: str = "default",
+        max_queued: int = 32,
+        max_backlog: int = 1024,
+        max_jobs: int = 10_000,
+        job_ttl: float = 3600,
+    ):
         self._manager = model_manager
         self._max_workers = max_workers
-        self._queue: asyncio.Queue[Job] = asyncio.Queue()
-        self._jobs: dict[str, Job] = {}        # job_id → Job (in-memory store)
+        self._name = name
+        # Bounded so bursts are pushed back to clients instead of held in memory
+        self._queue: asyncio.PriorityQueue[tuple[float, int, Optional[Job]]]
+        self._queue = asyncio.PriorityQueue(maxsize=max(2 * max_workers, max_queued))
+        self._seq = itertools.count()         # FIFO tie-break between equal deadlines
+        # Batch jobs beyond the queue's free slots wait here and are fed in as
+        # workers free up, so large batches get backpressure instead of a 503
+        self._max_backlog = max_backlog
+        self._backlog = 0
+        self._feeders: set[asyncio.Task] = set()
+        # Pending/running jobs stay in a plain dict; only finished ones move to
+        # the TTL cache, so a long-queued job can't expire before it completes
+        self._active: dict[str, Job] = {}
+        self._jobs: TTLCache[str, Job] = TTLCache(maxsize=max_jobs, ttl=job_ttl)
         self._workers: list[asyncio.Task] = []
         self._running = False
 
     async def start(self):
         self._running = True
         for i in range(self._max_workers):
-            task = asyncio.create_task(self._worker(i), name=f"alchemy-worker-{i}")
+            task = asyncio.create_task(self._worker(i), name=f"alchemy-{self._name}-worker-{i}")
             self._workers.append(task)
-        logger.info(f"Job queue started with {self._max_workers} workers.")
+        logger.info(f"Job queue '{self._name}' started with {self._max_workers} workers.")
 
     async def stop(self):
         self._running = False
-        # Drain the queue
+        for task in self._feeders:
+            task.cancel()
+        await asyncio.gather(*self._feeders, return_exceptions=True)
+        self._backlog = 0   # backlogged jobs are dropped at shutdown
+        # Wake idle workers; busy ones exit after their current job
         for _ in self._workers:
-            await self._queue.put(None)   # sentinel
+            try:
+                self._queue.put_nowait((-1, next(self._seq), None))   # sentinel
+            except asyncio.QueueFull:
+                break
         await asyncio.gather(*self._workers, return_exceptions=True)
-        logger.info("Job queue stopped.")
+        logger.info(f"Job queue '{self._name}' stopped.")
 
     async def enqueue(self, job: Job):
-        self._jobs[job.id] = job
-        await self._queue.put(job)
+        """Queue a job. Raises asyncio.QueueFull when the backlog is at capacity."""
+        self._put(job)
+        self._active[job.id] = job
+
+    async def enqueue_many(self, jobs: list[Job]):
+        """
+        Queue several jobs. Those that don't fit in the queue right now go to
+        the backlog and are fed in as slots free up. Raises asyncio.QueueFull,
+        queuing nothing, if the backlog can't take the overflow either.
+        """
+        free = self._queue.maxsize - self._queue.qsize()
+        overflow = jobs[free:]
+        if self._backlog + len(overflow) > self._max_backlog:
+            raise asyncio.QueueFull
+        for job in jobs:
+            self._active[job.id] = job
+        for job in jobs[:free]:
+            self._put(job)
+        if overflow:
+            self._backlog += len(overflow)
+            task = asyncio.create_task(self._feed(overflow), name=f"alchemy-{self._name}-feeder")
+            self._feeders.add(task)
+            task.add_done_callback(self._feeders.discard)
+
+    async def _feed(self, jobs: list[Job]):
+        """Move backlogged jobs into the queue, waiting for a free slot each time."""
+        for job in jobs:
+            await self._queue.put(self._entry(job))
+            self._backlog -= 1
+
+    def _put(self, job: Job):
+        self._queue.put_nowait(self._entry(job))
+
+    def _entry(self, job: Job) -> tuple[float, int, Job]:
+        # Virtual deadline: same as lowering the job's bucket by one for every
+        # AGE_STEP_S it waits, but fixed at insert so the heap stays valid
+        deadline = time.monotonic() + cost_bucket(job.cost_hint) * AGE_STEP_S
+        return deadline, next(self._seq), job
+
+    @property
+    def max_batch(self) -> int:
+        """Largest batch enqueue_many can ever accept (queue depth + backlog)."""
+        return self._queue.maxsize + self._max_backlog
 
     async def run_sync(self, job: Job) -> Any:
         """Run a job immediately in the current event loop without queuing."""
-        self._jobs[job.id] = job
+        self._active[job.id] = job
         await self._execute(job)
         if job.error:
             raise RuntimeError(job.error)
         return job.result
 
+    async def run_detached(self, job: Job) -> Any:
+        """Like run_sync, but the job is never recorded for /job lookups (offline batches)."""
+        await self._execute(job)
+        if job.error:
+            raise RuntimeError(job.error)
+        return job.result
+
+    @staticmethod
+    def discard_upload(job: Job):
+        """Delete a job's spooled upload file, if it has one."""
+        path = getattr(job.payload, "content_path", None)
+        if path:
+            job.payload.content_path = None
+            Path(path).unlink(missing_ok=True)
+
     def get_job(self, job_id: str) -> Optional[Job]:
-        return self._jobs.get(job_id)
+        return self._active.get(job_id) or self._jobs.get(job_id)
 
     def queue_size(self) -> int:
-        return self._queue.qsize()
+        return self._queue.qsize() + self._backlog
 
     # ── Internal ──────────────────────────────────────────────────────────────
     async def _worker(self, worker_id: int):
         logger.debug(f"Worker {worker_id} started.")
         while self._running:
             try:
-                job = await self._queue.get()
+                _, _, job = await self._queue.get()
                 if job is None:  # sentinel
                     break
-                logger.info(f"[Worker {worker_id}] Processing job {job.id} ({job.task})")
+                logger.info(
+                    f"[{self._name} worker {worker_id}] Processing job {job.id} ({job.task})"
+                )
                 await self._execute(job)
+                job.compact()
                 self._queue.task_done()
             except asyncio.CancelledError:
                 break
@@ -103,48 +322,63 @@ class JobQueue:
             job.error = str(e)
             job.status = JobStatus.FAILED
         finally:
+            self.discard_upload(job)
             job.completed_at = time.time()
+            if self._active.pop(job.id, None) is not None:
+                self._jobs[job.id] = job
+            job.done.set()
 
     async def _dispatch(self, job: Job) -> Any:
         p = job.payload
+        m = self._manager
         match job.task:
             case "parse_document":
-                return await self._manager.document_parser.parse(
-                    content=p["content"],
-                    filename=p["filename"],
-                    extract_tables=p.get("extract_tables", True),
-                    extract_images=p.get("extract_images", True),
-                    output_format=p.get("output_format", "markdown"),
-                )
+                # Parsers read a spooled upload straight from disk
+                async with m.use_document_parser() as parser:
+                    return await parser.parse(
+                        content=p.content,
+                        path=p.content_path,
+                        filename=p.filename,
+                        extract_tables=p.extract_tables,
+                        extract_images=p.extract_images,
+                        output_format=p.output_format,
+                    )
             case "parse_image":
-                return await self._manager.image_parser.parse(
-                    content=p["content"],
-                    filename=p["filename"],
-                    task=p.get("task", "detailed_caption"),
-                    prompt=p.get("prompt"),
-                )
+                async with m.use_image_parser() as parser:
+                    return await parser.parse(
+                        content=p.content,
+                        path=p.content_path,
+                        filename=p.filename,
+                        task=p.image_task,
+                        prompt=p.prompt,
+                    )
             case "parse_audio":
-                return await self._manager.media_parser.parse_audio(
-                    content=p["content"],
-                    filename=p["filename"],
-                    language=p.get("language"),
-                    diarize=p.get("diarize", False),
-                )
+                async with m.use_media_parser() as parser:
+                    return await parser.parse_audio(
+                        content=p.content,
+                        path=p.content_path,
+                        filename=p.filename,
+                        language=p.language,
+                        diarize=p.diarize,
+                    )
             case "parse_video":
-                return await self._manager.media_parser.parse_video(
-                    content=p["content"],
-                    filename=p["filename"],
-                    language=p.get("language"),
-                    diarize=p.get("diarize", False),
-                    extract_frames=p.get("extract_frames", False),
-                )
+                async with m.use_media_parser() as parser:
+                    return await parser.parse_video(
+                        content=p.content,
+                        path=p.content_path,
+                        filename=p.filename,
+                        language=p.language,
+                        diarize=p.diarize,
+                        extract_frames=p.extract_frames,
+                    )
             case "parse_web":
-                return await self._manager.web_parser.parse(
-                    url=p["url"],
-                    max_depth=p.get("max_depth", 1),
-                    css_selector=p.get("css_selector"),
-                    extraction_schema=p.get("extraction_schema"),
-                    headers=p.get("headers"),
-                )
+                async with m.use_web_parser() as parser:
+                    return await parser.parse(
+                        url=p.url,
+                        max_depth=p.max_depth,
+                        css_selector=p.css_selector,
+                        extraction_schema=p.extraction_schema,
+                        headers=p.headers,
+                    )
             case _:
                 raise ValueError(f"Unknown task: {job.task}")
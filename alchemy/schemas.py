@@ -63,10 +63,31 @@ class ParseResponse(BaseModel):
     raw: Optional[Any] = None            # full structured JSON (if output_format=json)
 
 
+# ─── Offline Batches ──────────────────────────────────────────────────────────
+class BatchCreateRequest(BaseModel):
+    input_path: str = Field(
+        ..., description="JSONL file under BATCH_DIR, one parse request per line"
+    )
+    output_path: Optional[str] = None           # under BATCH_DIR; defaults next to the input file
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: JobStatus
+    input_path: str
+    output_path: str
+    error: Optional[str] = None
+
+
 # ─── Web ──────────────────────────────────────────────────────────────────────
+MAX_CRAWL_DEPTH = 5
+
+
 class WebParseRequest(BaseModel):
     url: str = Field(..., description="URL to parse")
-    max_depth: int = Field(1, ge=1, le=5, description="Crawl depth for following links")
+    max_depth: int = Field(
+        1, ge=1, le=MAX_CRAWL_DEPTH, description="Crawl depth for following links"
+    )
     include_links: bool = False
     css_selector: Optional[str] = None          # scope extraction to a selector
     extraction_schema: Optional[dict] = None    # JSON schema for structured extraction
@@ -0,0 +1,70 @@
+"""
+Upload spooling
+---------------
+Moves request uploads out of the ASGI layer and into a temp file that
+queued jobs can reference by path.
+
+Starlette already buffers uploads in a SpooledTemporaryFile, which rolls
+over to a real file past 1 MB. On Linux, those large uploads are copied
+file-to-file inside the kernel with os.sendfile, never passing through
+Python. Everything else (small in-memory uploads, other platforms) is
+copied in chunks.
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+from starlette.formparsers import MultiPartParser
+
+CHUNK_SIZE = 1 << 20
+# Size past which Starlette's multipart parser rolls an upload over to disk
+_SPOOL_MAX_SIZE = getattr(MultiPartParser, "spool_max_size", 1 << 20)
+
+
+async def spool_upload(file: UploadFile, filename: Optional[str]) -> str:
+    """
+    Copy an upload to a temp file and return its path. The caller owns the
+    file; JobQueue deletes it once the job finishes.
+    """
+    tmp = tempfile.NamedTemporaryFile(
+        prefix="alchemy-", suffix=Path(filename or "").suffix, delete=False
+    )
+    try:
+        with tmp:
+            if _on_disk(file):
+                await asyncio.to_thread(_sendfile, file.file, tmp)
+            else:
+                while chunk := await file.read(CHUNK_SIZE):
+                    await asyncio.to_thread(tmp.write, chunk)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name
+
+
+def _on_disk(file: UploadFile) -> bool:
+    """True when the upload has been spooled to a real file sendfile can read."""
+    # sendfile into a regular file is Linux-only (macOS requires a socket)
+    if sys.platform != "linux":
+        return False
+    # Past the parser's spool limit the upload has rolled over to disk;
+    # below it, fileno() would force a needless rollover
+    return file.size is not None and file.size > _SPOOL_MAX_SIZE
+
+
+def _sendfile(src, dst) -> None:
+    src.flush()
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            raise OSError(f"sendfile stopped after {offset} of {size} bytes")
+        offset += sent
@@ -0,0 +1,30 @@
+"""
+CPU affinity helpers
+--------------------
+Split the CPUs a server may use into disjoint slices, one per worker
+process, so workers don't contend for the same cores while each keeps
+intra-op (torch/OpenMP) parallelism within its slice. Linux only; a no-op
+where sched_setaffinity is missing.
+"""
+
+from __future__ import annotations
+import os
+from typing import Optional
+
+
+def pin_to_slice(slot: int, num_slots: int) -> Optional[list[int]]:
+    """
+    Pin the calling process to the `slot`-th of `num_slots` contiguous,
+    disjoint slices of its allowed CPUs. Returns the slice, or None if
+    unsupported.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    num_slots = max(1, min(num_slots, len(cores)))
+    i = slot % num_slots
+    per, extra = divmod(len(cores), num_slots)
+    start = i * per + min(i, extra)
+    share = cores[start : start + per + (i < extra)]
+    os.sched_setaffinity(0, share)
+    return share
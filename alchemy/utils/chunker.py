@@ -8,6 +8,10 @@ Strategy:
   2. If a section exceeds chunk_size tokens, further split on paragraphs.
   3. Apply sliding window overlap so context isn't cut off at boundaries.
   4. Attach section heading as metadata for better retrieval context.
+  5. Prepend the source and section heading to each chunk's text so that
+     chunks embedded in isolation keep their context.
+
+Token counts use tiktoken's cl100k_base encoding when available.
 """
 
 from __future__ import annotations
@@ -16,103 +20,152 @@ from typing import Optional
 
 from alchemy.schemas import DocumentChunk
 
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:   # tiktoken missing, or BPE file unavailable offline
+    _ENC = None
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
+_PARA_SPLIT_RE = re.compile(r"\n\n+")
+
+
+def _trimmed(text: str, start: int, end: int) -> str:
+    """text[start:end].strip() with a single slice of the source."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return text[start:end]
+
 
 class SemanticChunker:
-    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 64):
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        prepend_title: bool = True,
+        prepend_source: bool = True,
+    ):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.prepend_title = prepend_title
+        self.prepend_source = prepend_source
 
-    def chunk(self, text: str) -> list[DocumentChunk]:
+    def chunk(self, text: str, source_title: Optional[str] = None) -> list[DocumentChunk]:
         if not text or not text.strip():
             return []
 
         sections = self._split_by_headings(text)
+        # Chunks are built from trusted values, so model_construct skips
+        # per-field validation (thousands of chunks on large documents).
         chunks: list[DocumentChunk] = []
         index = 0
 
         for section_title, section_text in sections:
             token_count = self._estimate_tokens(section_text)
 
+            # Context header (source, then section heading), counted once per section
+            header_parts = []
+            if self.prepend_source and source_title:
+                header_parts.append(source_title)
+            if self.prepend_title and section_title:
+                header_parts.append(section_title)
+            header = "\n\n".join(header_parts)
+            header_tokens = self._estimate_tokens(header) if header else 0
+
             if token_count <= self.chunk_size:
-                chunks.append(DocumentChunk(
+                body = section_text.strip()
+                chunks.append(DocumentChunk.model_construct(
                     index=index,
-                    text=section_text.strip(),
+                    text=f"{header}\n\n{body}" if header else body,
                     section=section_title,
-                    tokens=token_count,
+                    tokens=token_count + header_tokens,
                 ))
                 index += 1
             else:
                 # Split large sections into overlapping sub-chunks
                 sub_chunks = self._sliding_window(section_text)
-                for sub in sub_chunks:
-                    chunks.append(DocumentChunk(
+                for sub_text, sub_tokens in sub_chunks:
+                    chunks.append(DocumentChunk.model_construct(
                         index=index,
-                        text=sub.strip(),
+                        text=f"{header}\n\n{sub_text}" if header else sub_text,
                         section=section_title,
-                        tokens=self._estimate_tokens(sub),
+                        tokens=sub_tokens + header_tokens,
                     ))
                     index += 1
 
         return chunks
 
     def _split_by_headings(self, text: str) -> list[tuple[Optional[str], str]]:
-        """Split text on markdown headings (# / ## / ###)."""
-        heading_pattern = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
-        matches = list(heading_pattern.finditer(text))
-
-        if not matches:
-            return [(None, text)]
-
+        """Split text on markdown headings (# / ## / ###) in a single forward pass."""
         sections: list[tuple[Optional[str], str]] = []
+        heading: Optional[str] = None
+        body_start = pos = 0
+
+        for line in text.splitlines(keepends=True):
+            match = _HEADING_RE.match(line)
+            if match is not None:
+                # Flush the section that this heading closes
+                body = _trimmed(text, body_start, pos)
+                if body:
+                    sections.append((heading, body))
+                heading = match.group(2).strip()
+                body_start = pos + len(line)
+            pos += len(line)
+
+        if heading is None:
+            return [(None, text)]
 
-        # Text before the first heading
-        preamble = text[: matches[0].start()].strip()
-        if preamble:
-            sections.append((None, preamble))
-
-        for i, match in enumerate(matches):
-            heading = match.group(2).strip()
-            start = match.end()
-            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-            body = text[start:end].strip()
-            if body:
-                sections.append((heading, body))
-
+        body = _trimmed(text, body_start, pos)
+        if body:
+            sections.append((heading, body))
         return sections
 
-    def _sliding_window(self, text: str) -> list[str]:
-        """Split long text into overlapping windows at paragraph boundaries."""
-        paragraphs = [p.strip() for p in re.split(r"\n\n+", text) if p.strip()]
-        windows: list[str] = []
+    def _sliding_window(self, text: str) -> list[tuple[str, int]]:
+        """
+        Split long text into overlapping windows at paragraph boundaries.
+        Returns (window_text, token_count) pairs; each paragraph is estimated once.
+        """
+        texts = [p for p in (raw.strip() for raw in _PARA_SPLIT_RE.split(text)) if p]
+        paragraphs = list(zip(texts, self._estimate_tokens_batch(texts)))
+        windows: list[tuple[str, int]] = []
         current_tokens = 0
-        current_paras: list[str] = []
+        current: list[tuple[str, int]] = []
 
-        for para in paragraphs:
-            para_tokens = self._estimate_tokens(para)
-
-            if current_tokens + para_tokens > self.chunk_size and current_paras:
-                windows.append("\n\n".join(current_paras))
+        for para, para_tokens in paragraphs:
+            if current_tokens + para_tokens > self.chunk_size and current:
+                windows.append(("\n\n".join(p for p, _ in current), current_tokens))
                 # Overlap: keep last N tokens worth of paragraphs
-                overlap_paras: list[str] = []
+                overlap: list[tuple[str, int]] = []
                 overlap_tokens = 0
-                for p in reversed(current_paras):
-                    t = self._estimate_tokens(p)
+                for p, t in reversed(current):
                     if overlap_tokens + t > self.chunk_overlap:
                         break
-                    overlap_paras.insert(0, p)
+                    overlap.append((p, t))
                     overlap_tokens += t
-                current_paras = overlap_paras
+                overlap.reverse()
+                current = overlap
                 current_tokens = overlap_tokens
 
-            current_paras.append(para)
+            current.append((para, para_tokens))
             current_tokens += para_tokens
 
-        if current_paras:
-            windows.append("\n\n".join(current_paras))
+        if current:
+            windows.append(("\n\n".join(p for p, _ in current), current_tokens))
 
         return windows
 
     @staticmethod
     def _estimate_tokens(text: str) -> int:
-        """Rough token estimate: ~4 chars per token (GPT-family heuristic)."""
-        return max(1, len(text) // 4)
+        """Token count with the cl100k_base tokenizer (falls back to ~4 chars per token)."""
+        if _ENC is None:
+            return max(1, len(text) // 4)
+        return max(1, len(_ENC.encode(text, disallowed_special=())))
+
+    @staticmethod
+    def _estimate_tokens_batch(texts: list[str]) -> list[int]:
+        """Batched _estimate_tokens — one FFI round-trip for many paragraphs."""
+        if _ENC is None:
+            return [max(1, len(t) // 4) for t in texts]
+        return [max(1, len(ids)) for ids in _ENC.encode_batch(texts, disallowed_special=())]
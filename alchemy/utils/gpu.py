@@ -0,0 +1,51 @@
+"""
+GPU memory helpers
+------------------
+Shared by the parsers so every model swap returns its VRAM to the driver
+instead of leaving blocks parked in the PyTorch caching allocator.
+
+Releasing a model is two steps with the caller dropping its references in
+between — the cache flush can only free tensors nothing points to:
+
+    model, self._model = self._model, None
+    offload_to_cpu(model)
+    del model
+    flush_gpu_cache()
+"""
+
+from __future__ import annotations
+import gc
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def offload_to_cpu(*objs: Any) -> None:
+    """
+    Move objects off-device. Module tensors are only released once they
+    leave the device; objects without `.to` (e.g. CTranslate2 models, which
+    free their memory on deletion) are skipped.
+    """
+    for obj in objs:
+        if obj is None or not hasattr(obj, "to"):
+            continue
+        try:
+            obj.to("cpu")
+        except Exception as e:
+            # e.g. dispatched/quantised weights that can't move; their VRAM
+            # is only returned once the last reference is dropped
+            logger.warning(f"Could not move {type(obj).__name__} to CPU: {e}")
+
+
+def flush_gpu_cache() -> None:
+    """Collect garbage and flush the CUDA / MPS allocator caches."""
+    import torch
+
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+    elif torch.backends.mps.is_available():
+        torch.mps.empty_cache()
@@ -0,0 +1,16 @@
+"""
+Job ID helpers
+--------------
+Random (version 4) UUIDs for batch submissions, drawn from a single
+os.urandom() read instead of one syscall per ID.
+"""
+
+from __future__ import annotations
+import os
+import uuid
+
+
+def uuid4_batch(n: int) -> list[str]:
+    """Return `n` random UUID4 strings."""
+    buf = os.urandom(16 * n)
+    return [str(uuid.UUID(bytes=buf[i : i + 16], version=4)) for i in range(0, 16 * n, 16)]
@@ -19,6 +19,7 @@ Usage:
 
 from __future__ import annotations
 import asyncio
+import contextlib
 import json
 import time
 from pathlib import Path
@@ -26,6 +27,13 @@ from typing import Any, Optional
 
 import httpx
 
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 
 class AlchemyResult:
     def __init__(self, data: dict):
@@ -62,7 +70,18 @@ class AlchemyResult:
 class AlchemyClient:
     def __init__(self, base_url: str = "http://localhost:8000", timeout: int = 120):
         self.base_url = base_url.rstrip("/")
-        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=timeout)
+        # HTTP/2 multiplexes batch uploads and polls over one TLS connection;
+        # plain http:// URLs stay on HTTP/1.1 keep-alive.
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            http2=_HTTP2,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=30.0,
+            ),
+        )
 
     async def __aenter__(self):
         return self
@@ -89,15 +108,15 @@ class AlchemyClient:
     ) -> AlchemyResult:
         path = Path(path)
         with open(path, "rb") as f:
-            content = f.read()
-        files = {"file": (path.name, content, "application/octet-stream")}
-        data = {
-            "extract_tables": str(extract_tables).lower(),
-            "extract_images": str(extract_images).lower(),
-            "output_format": output_format,
-            "async_mode": str(async_mode).lower(),
-        }
-        r = await self._client.post("/parse/document", files=files, data=data)
+            # httpx streams the handle in chunks instead of buffering the whole file
+            files = {"file": (path.name, f, "application/octet-stream")}
+            data = {
+                "extract_tables": str(extract_tables).lower(),
+                "extract_images": str(extract_images).lower(),
+                "output_format": output_format,
+                "async_mode": str(async_mode).lower(),
+            }
+            r = await self._client.post("/parse/document", files=files, data=data)
         r.raise_for_status()
         result = AlchemyResult(r.json())
         if async_mode:
@@ -113,12 +132,11 @@ class AlchemyClient:
     ) -> AlchemyResult:
         path = Path(path)
         with open(path, "rb") as f:
-            content = f.read()
-        files = {"file": (path.name, content, "image/jpeg")}
-        data = {"task": task}
-        if prompt:
-            data["prompt"] = prompt
-        r = await self._client.post("/parse/image", files=files, data=data)
+            files = {"file": (path.name, f, "image/jpeg")}
+            data = {"task": task}
+            if prompt:
+                data["prompt"] = prompt
+            r = await self._client.post("/parse/image", files=files, data=data)
         r.raise_for_status()
         return AlchemyResult(r.json())
 
@@ -131,12 +149,11 @@ class AlchemyClient:
     ) -> AlchemyResult:
         path = Path(path)
         with open(path, "rb") as f:
-            content = f.read()
-        files = {"file": (path.name, content, "audio/mpeg")}
-        data = {"diarize": str(diarize).lower()}
-        if language:
-            data["language"] = language
-        r = await self._client.post("/parse/audio", files=files, data=data)
+            files = {"file": (path.name, f, "audio/mpeg")}
+            data = {"diarize": str(diarize).lower()}
+            if language:
+                data["language"] = language
+            r = await self._client.post("/parse/audio", files=files, data=data)
         r.raise_for_status()
         return AlchemyResult(r.json())
 
@@ -150,16 +167,15 @@ class AlchemyClient:
     ) -> AlchemyResult:
         path = Path(path)
         with open(path, "rb") as f:
-            content = f.read()
-        files = {"file": (path.name, content, "video/mp4")}
-        data = {
-            "diarize": str(diarize).lower(),
-            "extract_frames": str(extract_frames).lower(),
-            "async_mode": "true",
-        }
-        if language:
-            data["language"] = language
-        r = await self._client.post("/parse/video", files=files, data=data)
+            files = {"file": (path.name, f, "video/mp4")}
+            data = {
+                "diarize": str(diarize).lower(),
+                "extract_frames": str(extract_frames).lower(),
+                "async_mode": "true",
+            }
+            if language:
+                data["language"] = language
+            r = await self._client.post("/parse/video", files=files, data=data)
         r.raise_for_status()
         result = AlchemyResult(r.json())
         return await self._poll(result.job_id)
@@ -184,13 +200,14 @@ class AlchemyClient:
         paths: list[str | Path],
         output_format: str = "markdown",
     ) -> list[AlchemyResult]:
-        files = []
-        for path in paths:
-            path = Path(path)
-            with open(path, "rb") as f:
-                files.append(("files", (path.name, f.read(), "application/octet-stream")))
         data = {"output_format": output_format}
-        r = await self._client.post("/parse/batch", files=files, data=data)
+        with contextlib.ExitStack() as stack:
+            files = []
+            for path in paths:
+                path = Path(path)
+                f = stack.enter_context(open(path, "rb"))
+                files.append(("files", (path.name, f, "application/octet-stream")))
+            r = await self._client.post("/parse/batch", files=files, data=data)
         r.raise_for_status()
         job_responses = r.json()
         # Poll all jobs concurrently
@@ -203,15 +220,41 @@ class AlchemyClient:
     async def _poll(
         self,
         job_id: str,
-        interval: float = 1.0,
+        max_interval: float = 5.0,
         timeout: float = 300.0,
     ) -> AlchemyResult:
         start = time.time()
+        # Prefer the server's SSE stream; fall back to polling on older servers
+        try:
+            data = await asyncio.wait_for(self._wait_events(job_id), timeout)
+            if data is not None:
+                return AlchemyResult(data)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Job {job_id} did not complete within {timeout}s") from None
+        except httpx.HTTPError:
+            pass
+
+        # Exponential backoff: 0.25s → ~5s, so long jobs cost O(log n) polls
+        delay = 0.25
         while time.time() - start < timeout:
             r = await self._client.get(f"/job/{job_id}")
             r.raise_for_status()
             data = r.json()
             if data["status"] in ("done", "failed"):
                 return AlchemyResult(data)
-            await asyncio.sleep(interval)
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.7, max_interval)
         raise TimeoutError(f"Job {job_id} did not complete within {timeout}s")
+
+    async def _wait_events(self, job_id: str) -> Optional[dict]:
+        """Wait on /job/{id}/events; returns None if the server has no SSE endpoint."""
+        async with self._client.stream("GET", f"/job/{job_id}/events") as r:
+            if r.status_code != 200:
+                return None
+            async for line in r.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                data = json.loads(line[6:])
+                if data["status"] in ("done", "failed"):
+                    return data
+        return None
@@ -10,11 +10,24 @@ Usage:
 import argparse
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("download")
 
 
+def _snapshot(repo_id: str) -> None:
+    """Fetch a HF repo, skipping the network entirely when it is already cached."""
+    from huggingface_hub import snapshot_download
+    try:
+        snapshot_download(repo_id, local_files_only=True)
+        logger.info(f"✅ {repo_id} already cached.")
+        return
+    except Exception:
+        pass
+    snapshot_download(repo_id, max_workers=8)
+
+
 def download_documents():
     logger.info("📄 Downloading Docling models...")
     try:
@@ -26,8 +39,7 @@ def download_documents():
 
     logger.info("🖼️  Downloading Qwen2-VL-7B-Instruct-AWQ...")
     try:
-        from huggingface_hub import snapshot_download
-        snapshot_download("Qwen/Qwen2-VL-7B-Instruct-AWQ")
+        _snapshot("Qwen/Qwen2-VL-7B-Instruct-AWQ")
         logger.info("✅ Qwen2-VL downloaded.")
     except Exception as e:
         logger.error(f"Failed: {e}")
@@ -36,8 +48,15 @@ def download_documents():
 def download_media():
     logger.info("🎙️  Downloading Distil-Whisper Large-v3...")
     try:
-        from faster_whisper import WhisperModel
-        WhisperModel("distil-whisper/distil-large-v3", device="cpu", compute_type="int8")
+        # Same files WhisperModel would fetch, without loading the weights
+        from faster_whisper.utils import download_model
+        try:
+            download_model("distil-whisper/distil-large-v3", local_files_only=True)
+            logger.info("✅ Distil-Whisper already cached.")
+            return
+        except Exception:
+            pass
+        download_model("distil-whisper/distil-large-v3")
         logger.info("✅ Distil-Whisper downloaded.")
     except Exception as e:
         logger.error(f"Failed: {e}")
@@ -61,12 +80,19 @@ if __name__ == "__main__":
     parser.add_argument("--all", action="store_true")
     args = parser.parse_args()
 
+    jobs = []
     if args.all or args.documents:
-        download_documents()
+        jobs.append(download_documents)
     if args.all or args.media:
-        download_media()
+        jobs.append(download_media)
     if args.all or args.web:
-        download_web()
+        jobs.append(download_web)
+
+    # Downloads are I/O-bound — run them side by side
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            for future in [pool.submit(job) for job in jobs]:
+                future.result()
 
     if not any(vars(args).values()):
         parser.print_help()
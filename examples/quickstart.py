@@ -53,4 +53,8 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    (uvloop.run if uvloop else asyncio.run)(main())
@@ -5,59 +5,112 @@ Rebuilt with Docling, Distil-Whisper, Crawl4AI, and async-first architecture.
 
 import asyncio
 import argparse
+import atexit
+import importlib.util
 import logging
+import logging.handlers
+import os
+import queue
 import uuid
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Optional
 
 import uvicorn
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, Form, Query, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from alchemy.config import Settings
+from alchemy.fast_schemas import JobStatusStruct, MsgspecJSONResponse, encode
 from alchemy.models.manager import ModelManager
-from alchemy.queue.worker import JobQueue, Job, JobStatus
+from alchemy.queue.batch_runner import Batch, BatchRunner
+from alchemy.queue.worker import (
+    TASK_FAMILIES,
+    AudioPayload,
+    DocPayload,
+    ImagePayload,
+    Job,
+    JobQueue,
+    JobStatus,
+    VideoPayload,
+    WebPayload,
+)
 from alchemy.schemas import (
+    MAX_CRAWL_DEPTH,
+    BatchCreateRequest,
+    BatchStatusResponse,
     ParseResponse,
     JobResponse,
     JobStatusResponse,
     WebParseRequest,
     ProcessImageRequest,
 )
+from alchemy.upload import spool_upload
+from alchemy.utils.ids import uuid4_batch
 
 # ─── Logging ──────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
-)
+# Request handlers only enqueue records; formatting and the stderr write
+# happen on the QueueListener's thread.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s — %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))   # only merges args
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("alchemy")
 
 # ─── Settings & Global State ──────────────────────────────────────────────────
 settings = Settings()
 model_manager: Optional[ModelManager] = None
-job_queue: Optional[JobQueue] = None
+job_queues: dict[str, JobQueue] = {}      # task family → queue (see TASK_FAMILIES)
+batch_runner: Optional[BatchRunner] = None
+_READY = False    # set once lifespan has started everything; checked per request
 
 
 # ─── Lifespan ─────────────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global model_manager, job_queue
+    global model_manager, batch_runner, _READY
 
     logger.info("🚀 Starting Alchemy...")
     model_manager = ModelManager(settings)
     await model_manager.initialize()
 
-    job_queue = JobQueue(model_manager, max_workers=settings.max_workers)
-    await job_queue.start()
+    # One queue per task family so slow media jobs can't block documents or web
+    family_workers = {
+        "document": settings.max_workers,
+        "media": settings.media_workers,
+        "web": settings.web_workers,
+    }
+    for family, workers in family_workers.items():
+        job_queues[family] = JobQueue(
+            model_manager,
+            max_workers=workers,
+            name=family,
+            max_queued=settings.max_queue_size,
+            max_backlog=settings.max_batch_backlog,
+            max_jobs=settings.job_store_size,
+            job_ttl=settings.job_ttl_s,
+        )
+    await asyncio.gather(*(q.start() for q in job_queues.values()))
+    if settings.batch_dir:
+        batch_runner = BatchRunner(_queue_for, settings.batch_dir, batch_ttl=settings.job_ttl_s)
 
+    _READY = True
     logger.info("✅ Alchemy is ready.")
     yield
 
+    _READY = False
     logger.info("🛑 Shutting down Alchemy...")
-    await job_queue.stop()
+    if batch_runner:
+        await batch_runner.stop()
+    await asyncio.gather(*(q.stop() for q in job_queues.values()))
+    job_queues.clear()
     await model_manager.cleanup()
 
 
@@ -67,6 +120,7 @@ app = FastAPI(
     description="Transform any data into structured, LLM-ready output. Documents, images, audio, video, and web — all in one place.",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,   # C-speed serialisation for large results
 )
 
 app.add_middleware(
@@ -87,7 +141,7 @@ async def serve_ui():
     index = STATIC_DIR / "index.html"
     if index.exists():
         return FileResponse(str(index))
-    return JSONResponse({"message": "Alchemy API — visit /docs for API documentation"})
+    return ORJSONResponse({"message": "Alchemy API — visit /docs for API documentation"})
 
 
 # ─── Health ───────────────────────────────────────────────────────────────────
@@ -96,23 +150,63 @@ async def health():
     return {
         "status": "ok",
         "models_loaded": model_manager.loaded_models() if model_manager else [],
-        "queue_size": job_queue.queue_size() if job_queue else 0,
+        "queue_size": sum(q.queue_size() for q in job_queues.values()),
+        "queues": {family: q.queue_size() for family, q in job_queues.items()},
     }
 
 
 # ─── Job Status ───────────────────────────────────────────────────────────────
-@app.get("/job/{job_id}", response_model=JobStatusResponse, tags=["Jobs"])
+@app.get(
+    "/job/{job_id}",
+    response_class=MsgspecJSONResponse,
+    responses={200: {"model": JobStatusResponse}},
+    tags=["Jobs"],
+)
 async def get_job_status(job_id: str):
     """Poll the status of an async parse job."""
-    if not job_queue:
-        raise HTTPException(503, "Server not ready")
-    job = job_queue.get_job(job_id)
+    _assert_ready()
+    job = _find_job(job_id)
     if not job:
         raise HTTPException(404, f"Job {job_id} not found")
-    return JobStatusResponse(
+    return MsgspecJSONResponse(_job_status(job))
+
+
+@app.get("/job/{job_id}/events", tags=["Jobs"])
+async def job_events(job_id: str):
+    """
+    Stream job status as Server-Sent Events (SSE): the current status on
+    connect, then the final status once the job finishes. Comment lines are
+    sent as keep-alives while waiting.
+    """
+    _assert_ready()
+    job = _find_job(job_id)
+    if not job:
+        raise HTTPException(404, f"Job {job_id} not found")
+
+    async def event_stream():
+        yield f"data: {encode(_job_status(job)).decode()}\n\n"
+        while not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=15.0)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+        yield f"data: {encode(_job_status(job)).decode()}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _pending(jobs: list[Job]) -> list[dict]:
+    """Batch acknowledgements as plain dicts — same shape as JobResponse, no model per job."""
+    pending = JobStatus.PENDING.value
+    return [{"job_id": j.id, "status": pending, "result": None, "error": None} for j in jobs]
+
+
+def _job_status(job: Job) -> JobStatusStruct:
+    return JobStatusStruct(
         job_id=job.id,
         status=job.status,
-        result=job.result,
+        result=job.get_result(),
         error=job.error,
     )
 
@@ -132,24 +226,26 @@ async def parse_document(
     Set async_mode=true to get a job_id and poll for results.
     """
     _assert_ready()
-    content = await file.read()
+    filename = file.filename
+    content_path = await spool_upload(file, filename)
     job = Job(
         id=str(uuid.uuid4()),
         task="parse_document",
-        payload={
-            "content": content,
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "extract_tables": extract_tables,
-            "extract_images": extract_images,
-            "output_format": output_format,
-        },
+        cost_hint=os.path.getsize(content_path),
+        payload=DocPayload(
+            filename=filename,
+            content_path=content_path,
+            content_type=file.content_type,
+            extract_tables=extract_tables,
+            extract_images=extract_images,
+            output_format=output_format,
+        ),
     )
     if async_mode:
-        await job_queue.enqueue(job)
+        await _enqueue(job)
         return JobResponse(job_id=job.id, status=JobStatus.PENDING)
     else:
-        result = await job_queue.run_sync(job)
+        result = await _queue_for(job.task).run_sync(job)
         return JobResponse(job_id=job.id, status=JobStatus.DONE, result=result)
 
 
@@ -160,16 +256,15 @@ async def parse_document_stream(
 ):
     """Stream parsed pages back as Server-Sent Events (SSE)."""
     _assert_ready()
-    content = await file.read()
-
-    async def event_stream():
-        async for chunk in model_manager.document_parser.parse_streaming(
-            content, file.filename, extract_tables=extract_tables
-        ):
-            yield f"data: {chunk}\n\n"
-        yield "data: [DONE]\n\n"
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    content_path = await spool_upload(file, file.filename)
+    events = _leased_stream(
+        model_manager.use_document_parser(),
+        lambda parser: parser.parse_streaming(
+            None, file.filename, extract_tables=extract_tables, path=content_path
+        ),
+        upload=content_path,
+    )
+    return StreamingResponse(_coalesced_sse(events), media_type="text/event-stream")
 
 
 # ─── Image Endpoints ──────────────────────────────────────────────────────────
@@ -186,21 +281,23 @@ async def parse_image(
     Tasks: ocr | caption | detailed_caption | object_detection | table_extraction | qa
     """
     _assert_ready()
-    content = await file.read()
+    filename = file.filename
+    content_path = await spool_upload(file, filename)
     job = Job(
         id=str(uuid.uuid4()),
         task="parse_image",
-        payload={
-            "content": content,
-            "filename": file.filename,
-            "task": task,
-            "prompt": prompt,
-        },
+        cost_hint=os.path.getsize(content_path),
+        payload=ImagePayload(
+            filename=filename,
+            content_path=content_path,
+            image_task=task,
+            prompt=prompt,
+        ),
     )
     if async_mode:
-        await job_queue.enqueue(job)
+        await _enqueue(job)
         return JobResponse(job_id=job.id, status=JobStatus.PENDING)
-    result = await job_queue.run_sync(job)
+    result = await _queue_for(job.task).run_sync(job)
     return JobResponse(job_id=job.id, status=JobStatus.DONE, result=result)
 
 
@@ -217,24 +314,44 @@ async def parse_audio(
     Enable diarize=true for speaker-labeled transcripts.
     """
     _assert_ready()
-    content = await file.read()
+    filename = file.filename
+    content_path = await spool_upload(file, filename)
     job = Job(
         id=str(uuid.uuid4()),
         task="parse_audio",
-        payload={
-            "content": content,
-            "filename": file.filename,
-            "language": language,
-            "diarize": diarize,
-        },
+        cost_hint=os.path.getsize(content_path),
+        payload=AudioPayload(
+            filename=filename,
+            content_path=content_path,
+            language=language,
+            diarize=diarize,
+        ),
     )
     if async_mode:
-        await job_queue.enqueue(job)
+        await _enqueue(job)
         return JobResponse(job_id=job.id, status=JobStatus.PENDING)
-    result = await job_queue.run_sync(job)
+    result = await _queue_for(job.task).run_sync(job)
     return JobResponse(job_id=job.id, status=JobStatus.DONE, result=result)
 
 
+@app.post("/parse/audio/stream", tags=["Media"])
+async def parse_audio_stream(
+    file: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+):
+    """Stream transcript segments back as Server-Sent Events (SSE) while transcribing."""
+    _assert_ready()
+    content_path = await spool_upload(file, file.filename)
+    events = _leased_stream(
+        model_manager.use_media_parser(),
+        lambda parser: parser.parse_audio_streaming(
+            None, file.filename, language=language, path=content_path
+        ),
+        upload=content_path,
+    )
+    return StreamingResponse(_coalesced_sse(events), media_type="text/event-stream")
+
+
 @app.post("/parse/video", response_model=JobResponse, tags=["Media"])
 async def parse_video(
     file: UploadFile = File(...),
@@ -248,22 +365,24 @@ async def parse_video(
     Defaults to async mode given typical video file sizes.
     """
     _assert_ready()
-    content = await file.read()
+    filename = file.filename
+    content_path = await spool_upload(file, filename)
     job = Job(
         id=str(uuid.uuid4()),
         task="parse_video",
-        payload={
-            "content": content,
-            "filename": file.filename,
-            "language": language,
-            "diarize": diarize,
-            "extract_frames": extract_frames,
-        },
+        cost_hint=os.path.getsize(content_path),
+        payload=VideoPayload(
+            filename=filename,
+            content_path=content_path,
+            language=language,
+            diarize=diarize,
+            extract_frames=extract_frames,
+        ),
     )
     if async_mode:
-        await job_queue.enqueue(job)
+        await _enqueue(job)
         return JobResponse(job_id=job.id, status=JobStatus.PENDING)
-    result = await job_queue.run_sync(job)
+    result = await _queue_for(job.task).run_sync(job)
     return JobResponse(job_id=job.id, status=JobStatus.DONE, result=result)
 
 
@@ -278,93 +397,313 @@ async def parse_web(request: WebParseRequest):
     job = Job(
         id=str(uuid.uuid4()),
         task="parse_web",
-        payload=request.model_dump(),
+        cost_hint=_web_cost_hint(request.max_depth),
+        payload=WebPayload(
+            url=request.url,
+            max_depth=request.max_depth,
+            css_selector=request.css_selector,
+            extraction_schema=request.extraction_schema,
+            headers=request.headers,
+        ),
     )
     if request.async_mode:
-        await job_queue.enqueue(job)
+        await _enqueue(job)
         return JobResponse(job_id=job.id, status=JobStatus.PENDING)
-    result = await job_queue.run_sync(job)
+    result = await _queue_for(job.task).run_sync(job)
     return JobResponse(job_id=job.id, status=JobStatus.DONE, result=result)
 
 
-@app.post("/parse/web/batch", response_model=list[JobResponse], tags=["Web"])
-async def parse_web_batch(urls: list[str], max_depth: int = 1):
+@app.post(
+    "/parse/web/batch",
+    response_model=None,
+    responses={200: {"model": list[JobResponse]}},
+    tags=["Web"],
+)
+async def parse_web_batch(
+    urls: list[str],
+    max_depth: int = Query(1, ge=1, le=MAX_CRAWL_DEPTH),
+):
     """Crawl multiple URLs concurrently."""
     _assert_ready()
     jobs = [
         Job(
-            id=str(uuid.uuid4()),
+            id=job_id,
             task="parse_web",
-            payload={"url": url, "max_depth": max_depth, "async_mode": True},
+            cost_hint=_web_cost_hint(max_depth),
+            payload=WebPayload(url=url, max_depth=max_depth),
         )
-        for url in urls
+        for job_id, url in zip(uuid4_batch(len(urls)), urls)
     ]
-    for job in jobs:
-        await job_queue.enqueue(job)
-    return [JobResponse(job_id=j.id, status=JobStatus.PENDING) for j in jobs]
+    await _enqueue(*jobs)
+    return _pending(jobs)
 
 
 # ─── Batch Document Endpoint ──────────────────────────────────────────────────
-@app.post("/parse/batch", response_model=list[JobResponse], tags=["Documents"])
+@app.post(
+    "/parse/batch",
+    response_model=None,
+    responses={200: {"model": list[JobResponse]}},
+    tags=["Documents"],
+)
 async def parse_batch(
     files: list[UploadFile] = File(...),
     output_format: str = Form("markdown"),
 ):
     """Submit multiple files for parallel processing."""
     _assert_ready()
-    jobs = []
-    for file in files:
-        content = await file.read()
-        job = Job(
-            id=str(uuid.uuid4()),
+    headers = [(f.filename, f.content_type) for f in files]
+    # Spool all uploads concurrently; on any failure, drop the ones that succeeded
+    spooled = await asyncio.gather(
+        *(spool_upload(f, name) for f, (name, _) in zip(files, headers)),
+        return_exceptions=True,
+    )
+    errors = [r for r in spooled if isinstance(r, BaseException)]
+    if errors:
+        for r in spooled:
+            if isinstance(r, str):
+                os.unlink(r)
+        raise errors[0]
+
+    jobs = [
+        Job(
+            id=job_id,
             task="parse_document",
-            payload={
-                "content": content,
-                "filename": file.filename,
-                "content_type": file.content_type,
-                "output_format": output_format,
-                "extract_tables": True,
-                "extract_images": True,
-            },
+            cost_hint=os.path.getsize(content_path),
+            payload=DocPayload(
+                filename=filename,
+                content_path=content_path,
+                content_type=content_type,
+                output_format=output_format,
+            ),
         )
-        await job_queue.enqueue(job)
-        jobs.append(job)
-    return [JobResponse(job_id=j.id, status=JobStatus.PENDING) for j in jobs]
+        for job_id, content_path, (filename, content_type) in zip(
+            uuid4_batch(len(files)), spooled, headers
+        )
+    ]
+    await _enqueue(*jobs)
+    return _pending(jobs)
+
+
+# ─── Offline Batches ──────────────────────────────────────────────────────────
+@app.post("/v1/batches", response_model=BatchStatusResponse, tags=["Batches"])
+async def create_batch(request: BatchCreateRequest):
+    """
+    Run a JSONL file of parse requests in the background, outside the
+    interactive job queue. Results are written to output_path as JSONL.
+    Paths are relative to BATCH_DIR and must stay inside it.
+    """
+    _assert_batches()
+    try:
+        batch = batch_runner.submit(request.input_path, request.output_path)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(400, str(e))
+    return _batch_status(batch)
+
+
+@app.get("/v1/batches/{batch_id}", response_model=BatchStatusResponse, tags=["Batches"])
+async def get_batch_status(batch_id: str):
+    _assert_batches()
+    batch = batch_runner.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(404, f"Batch {batch_id} not found")
+    return _batch_status(batch)
+
+
+def _assert_batches():
+    _assert_ready()
+    if not batch_runner:
+        raise HTTPException(403, "Offline batches are disabled. Set BATCH_DIR to enable them.")
+
+
+def _batch_status(batch: Batch) -> BatchStatusResponse:
+    return BatchStatusResponse(
+        batch_id=batch.id,
+        status=batch.status,
+        input_path=batch.input_path,
+        output_path=batch.output_path,
+        error=batch.error,
+    )
 
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 def _assert_ready():
-    if not model_manager or not job_queue:
+    if not _READY:
         raise HTTPException(503, "Server is still initializing. Try again shortly.")
 
 
+def _web_cost_hint(max_depth: int) -> int:
+    # ~256 KB per page; WebParser follows up to 5 links per page per level.
+    # Clamped so the hint is always a bounded int, whatever the caller passes.
+    levels = min(max(max_depth, 1), MAX_CRAWL_DEPTH) - 1
+    return (256 << 10) * 5**levels
+
+
+async def _leased_stream(
+    lease: AsyncContextManager[Any],
+    stream: Callable[[Any], AsyncIterator[str]],
+    upload: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Hold a parser lease for as long as its event stream is being consumed,
+    then delete the stream's spooled `upload` file, if any.
+    """
+    try:
+        async with lease as parser, aclosing(stream(parser)) as events:
+            async for event in events:
+                yield event
+    finally:
+        if upload:
+            Path(upload).unlink(missing_ok=True)
+
+
+async def _coalesced_sse(
+    events: AsyncIterator[str],
+    max_bytes: int = 8192,
+    max_delay: float = 0.05,
+) -> AsyncIterator[bytes]:
+    """
+    Frame events as SSE and send them in batches: a write goes out once
+    max_bytes are buffered, or when no new event arrives within max_delay,
+    so bursts share one send() without holding back a lone event.
+    `events` is closed on exit, so a client disconnect stops the producer.
+    """
+    buf = bytearray()
+    it = events.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(it.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=max_delay if buf else None)
+            if not done:
+                yield bytes(buf)
+                buf.clear()
+                continue
+            fut, pending = pending, None
+            try:
+                event = fut.result()
+            except StopAsyncIteration:
+                break
+            buf += f"data: {event}\n\n".encode()
+            if len(buf) >= max_bytes:
+                yield bytes(buf)
+                buf.clear()
+    finally:
+        if pending is not None:
+            pending.cancel()
+            # The generator can't be closed while that __anext__ is still running
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(events, "aclose"):
+            await events.aclose()
+    buf += b"data: [DONE]\n\n"
+    yield bytes(buf)
+
+
+def _queue_for(task: str) -> JobQueue:
+    return job_queues[TASK_FAMILIES[task]]
+
+
+def _find_job(job_id: str) -> Job | None:
+    for jq in job_queues.values():
+        job = jq.get_job(job_id)
+        if job:
+            return job
+    return None
+
+
+async def _enqueue(*jobs: Job):
+    """
+    Queue jobs (all of one task family). Jobs beyond the queue's free slots
+    wait in its backlog; only when the backlog is full too is the request
+    turned away with 503 so clients back off. A batch bigger than queue +
+    backlog could ever hold gets 413, since retrying can't help.
+    """
+    if not jobs:
+        return
+    job_queue = _queue_for(jobs[0].task)
+    if len(jobs) > job_queue.max_batch:
+        for job in jobs:
+            JobQueue.discard_upload(job)
+        raise HTTPException(
+            413,
+            f"Batch of {len(jobs)} exceeds the limit of {job_queue.max_batch} jobs "
+            "(MAX_QUEUE_SIZE + MAX_BATCH_BACKLOG); split it into smaller batches.",
+        )
+    try:
+        await job_queue.enqueue_many(list(jobs))
+    except asyncio.QueueFull:
+        for job in jobs:
+            JobQueue.discard_upload(job)
+        raise HTTPException(
+            503, "Job queue is full. Try again shortly.", headers={"Retry-After": "5"}
+        )
+
+
 # ─── CLI ──────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Alchemy Server")
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8000)
-    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--workers", type=int, help="Document/image queue workers (default: MAX_WORKERS)"
+    )
     parser.add_argument("--documents", action="store_true", help="Load document models")
     parser.add_argument("--media", action="store_true", help="Load media models")
     parser.add_argument("--web", action="store_true", help="Enable web crawler")
     parser.add_argument("--all", action="store_true", help="Load all models")
     parser.add_argument("--reload", action="store_true", help="Dev hot-reload")
+    parser.add_argument("--http2", action="store_true", help="Serve via Hypercorn with HTTP/2")
+    parser.add_argument("--certfile", help="TLS certificate (HTTP/2 over TLS)")
+    parser.add_argument("--keyfile", help="TLS private key (HTTP/2 over TLS)")
     args = parser.parse_args()
 
-    # Inject CLI flags into environment so Settings picks them up
-    import os
-    if args.all or args.documents:
-        os.environ["LOAD_DOCUMENTS"] = "true"
-    if args.all or args.media:
-        os.environ["LOAD_MEDIA"] = "true"
-    if args.all or args.web:
-        os.environ["LOAD_WEB"] = "true"
-    settings.max_workers = args.workers
-
-    uvicorn.run(
-        "server:app",
-        host=args.host,
-        port=args.port,
-        reload=args.reload,
-        log_level="info",
-    )
+    # CLI flags override env/.env; naming any parser loads only the ones named
+    overrides = {}
+    if args.all or args.documents or args.media or args.web:
+        overrides.update(
+            load_documents=args.all or args.documents,
+            load_media=args.all or args.media,
+            load_web=args.all or args.web,
+        )
+    if args.workers is not None:
+        overrides["max_workers"] = args.workers
+    settings = Settings(**overrides)
+
+    # libuv-backed event loop (not on Windows) and C HTTP/1.1 parser where available
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    if args.http2:
+        # HTTP/2 lets polling clients multiplex /job/{id} requests on one connection
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"{args.host}:{args.port}"]
+        config.backlog = 2048
+        config.keep_alive_timeout = 30
+        config.certfile = args.certfile
+        config.keyfile = args.keyfile
+        if loop == "uvloop":
+            import uvloop
+            uvloop.run(serve(app, config))
+        else:
+            asyncio.run(serve(app, config))
+    else:
+        if args.reload:
+            # The reloader re-imports server:app in a child process, which
+            # only sees the environment — hand the overrides over that way.
+            for key, value in overrides.items():
+                os.environ[key.upper()] = str(value).lower()
+        uvicorn.run(
+            # Pass the app itself so lifespan uses the Settings built above
+            "server:app" if args.reload else app,
+            host=args.host,
+            port=args.port,
+            reload=args.reload,
+            loop=loop,
+            http=http,
+            backlog=2048,
+            timeout_keep_alive=30,
+            log_level="info",
+        )